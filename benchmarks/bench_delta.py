@@ -0,0 +1,71 @@
+"""Compare the time taken to extract the identifiers of the revisions of a
+large page, scanning the whole text of each revision and scanning only
+around the change from the previous one.
+
+Usage: python -m benchmarks.bench_delta [--revisions N] [--citations N]
+"""
+import argparse
+import random
+import time
+
+from wikidump import extractors
+
+
+def revision_texts(revisions: int, citations: int):
+    """Return the texts of a page, each revision edits a line of the
+    previous one.
+    """
+    rng = random.Random(0)
+    lines = [
+        'Some text of the paragraph {0}.<ref>{{{{cite journal|'
+        'doi=10.1000/paper.{0}|pmid={0}|isbn=978-0-{0}}}}}</ref>'
+        .format(i)
+        for i in range(citations)
+    ]
+    for revision in range(revisions):
+        i = rng.randrange(citations)
+        lines[i] = lines[i].replace('paper.', 'paper.{}.'.format(revision))
+        yield '\n'.join(lines)
+
+
+def timed(function):
+    """Return the seconds taken by function and its result."""
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--revisions', type=int, default=200)
+    parser.add_argument('--citations', type=int, default=1000)
+    args = parser.parse_args()
+
+    texts = list(revision_texts(args.revisions, args.citations))
+
+    def full_scans():
+        return [extractors.pub_identifier_arrays(text) for text in texts]
+
+    def delta_scans():
+        captures = []
+        extraction = None
+        for text in texts:
+            extraction = extractors.pub_identifier_extraction(
+                text, previous=extraction)
+            captures.append(extraction.captures())
+        return captures
+
+    full_time, expected = timed(full_scans)
+    delta_time, result = timed(delta_scans)
+    for captures, expected_captures in zip(result, expected):
+        assert list(captures) == list(expected_captures)
+
+    print('{} revisions of {:.1f} KiB'.format(
+        len(texts), sum(map(len, texts)) / len(texts) / 2**10))
+    print(' full: {:8.3f}s'.format(full_time))
+    print('delta: {:8.3f}s ({:.1f}x faster)'.format(
+        delta_time, full_time / delta_time))
+
+
+if __name__ == '__main__':
+    main()
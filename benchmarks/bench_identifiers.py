@@ -0,0 +1,63 @@
+"""Compare the extraction of the identifiers, one extractor after the other
+and in a single pass, on the revisions of a dump.
+
+Usage: python -m benchmarks.bench_identifiers DUMP [--revisions N] [--repeat N]
+"""
+import argparse
+import itertools
+import time
+
+from wikidump import readers
+from wikidump.__main__ import open_xml_file
+from wikidump.extractors import arxiv, combined, doi, isbn, pubmed
+
+
+def sequential(text):
+    return itertools.chain(
+        arxiv.extract(text),
+        doi.extract(text),
+        isbn.extract(text),
+        pubmed.extract(text),
+    )
+
+
+def read_texts(path: str, limit: int):
+    dump = readers.open_dump(open_xml_file(path), 'lxml')
+    revisions = (revision for page in dump for revision in page)
+    return [revision.text or '' for revision in
+            itertools.islice(revisions, limit)]
+
+
+def timed(extract, texts, repeat):
+    """Return the best time of the extraction and its results."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [list(extract(text)) for text in texts]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('dump')
+    parser.add_argument('--revisions', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    texts = read_texts(args.dump, args.revisions)
+    size = sum(len(text) for text in texts) / 2**20
+    print('{} revisions, {:.1f} MiB of text'.format(len(texts), size))
+
+    sequential_time, expected = timed(sequential, texts, args.repeat)
+    combined_time, results = timed(combined.extract, texts, args.repeat)
+    assert results == expected, 'The results differ'
+
+    print('sequential: {:8.3f}s'.format(sequential_time))
+    print('  combined: {:8.3f}s ({:.1f}x)'.format(
+        combined_time, sequential_time / combined_time))
+
+
+if __name__ == '__main__':
+    main()
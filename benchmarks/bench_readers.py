@@ -0,0 +1,44 @@
+"""Compare the speed of the XML readers on a dump.
+
+Usage: python -m benchmarks.bench_readers DUMP [--repeat N]
+"""
+import argparse
+import time
+
+from wikidump import readers
+from wikidump.__main__ import open_xml_file
+
+
+def consume(dump) -> int:
+    """Read every attribute used by the processors, return the revisions."""
+    revisions = 0
+    for page in dump:
+        page.id, page.title, page.namespace
+        for revision in page:
+            (revision.id, revision.parent_id, revision.user, revision.minor,
+             revision.comment, revision.model, revision.format,
+             revision.timestamp.to_json(), revision.text)
+            revisions += 1
+    return revisions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('dump')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for reader in sorted(readers.READERS):
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            xml_stream = open_xml_file(args.dump)
+            revisions = consume(readers.open_dump(xml_stream, reader))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print('{:>6}: {:8.3f}s, {:10.0f} revisions/s'.format(
+            reader, best, revisions / best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Compare the classification of the identifiers by where they appear, one
+span against all the others and with the span indexes, on a page with many
+references.
+
+Usage: python -m benchmarks.bench_spans [--refs N] [--repeat N]
+"""
+import argparse
+import time
+
+from wikidump import extractors
+from wikidump.extractors.common import SpanIndex
+from wikidump.processors.identifiers_extractor import where_appears
+
+
+def page(refs: int) -> str:
+    """Return the text of a page citing refs publications."""
+    paragraphs = []
+    for i in range(refs):
+        paragraphs.append(
+            'Lorem ipsum dolor sit amet.<ref>{{{{cite journal|title=Paper '
+            '{0}|doi=10.1000/x{0}|pmid={0}}}}}</ref> See also '
+            'isbn 978-3-16-148410-{1}.\n'.format(i, i % 10))
+        if i % 50 == 0:
+            paragraphs.append('== Section {} ==\n'.format(i))
+    return ''.join(paragraphs)
+
+
+def where_appears_linear(span, **spans):
+    return {
+        key
+        for key, span_list in spans.items()
+        if any(span <= other_span for other_span in span_list)
+    }
+
+
+def timed(function, repeat):
+    """Return the best time of function and its result."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--refs', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    text = page(args.refs)
+    spans = {
+        'references': [span for _, span in extractors.references(text)],
+        'templates': [span for template, span in
+                      extractors.balanced_templates(text)
+                      if template.depth == 0],
+        'sections': [span for _, span in
+                     extractors.sections(text, include_preamble=True)],
+    }
+    identifiers = [span for _, span in extractors.pub_identifiers(text)]
+    print('{} identifiers, {} references, {} templates, {} sections'.format(
+        len(identifiers), len(spans['references']), len(spans['templates']),
+        len(spans['sections'])))
+
+    linear_time, expected = timed(lambda: [
+        where_appears_linear(span, **spans) for span in identifiers
+    ], args.repeat)
+    index_time, result = timed(lambda: where_appears(identifiers, **{
+        key: SpanIndex(span_list) for key, span_list in spans.items()
+    }), args.repeat)
+    assert result == expected, 'The results differ'
+
+    print('linear: {:8.3f}s'.format(linear_time))
+    print(' index: {:8.3f}s ({:.1f}x)'.format(
+        index_time, linear_time / index_time))
+
+
+if __name__ == '__main__':
+    main()
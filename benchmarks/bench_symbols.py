@@ -0,0 +1,67 @@
+"""Compare the memory used by the history of the identifiers of a large
+page, keeping the identifiers of every revision and keeping their ids in a
+symbol table.
+
+Usage: python -m benchmarks.bench_symbols [--revisions N] [--citations N]
+"""
+import argparse
+import tracemalloc
+
+from wikidump import extractors
+
+
+def revision_texts(revisions: int, citations: int):
+    """Return the texts of a page with a slowly changing set of citations.
+    """
+    for revision in range(revisions):
+        yield ''.join(
+            '<ref>{{{{cite journal|doi=10.1000/paper.{0}|pmid={0}}}}}</ref>\n'
+            .format(i)
+            for i in range(revision // 10, revision // 10 + citations)
+        )
+
+
+def measure(history):
+    """Return the memory allocated by history and the history."""
+    tracemalloc.start()
+    result = history()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--revisions', type=int, default=1000)
+    parser.add_argument('--citations', type=int, default=100)
+    args = parser.parse_args()
+
+    texts = list(revision_texts(args.revisions, args.citations))
+
+    def identifiers_history():
+        return [
+            extractors.pub_identifier_arrays(text).distinct_identifiers()
+            for text in texts
+        ]
+
+    def ids_history():
+        symbols = extractors.common.SymbolTable()
+        return symbols, [
+            {symbols.id(identifier) for identifier in
+             extractors.pub_identifier_arrays(text).distinct_identifiers()}
+            for text in texts
+        ]
+
+    identifiers_size, expected = measure(identifiers_history)
+    ids_size, (symbols, result) = measure(ids_history)
+    assert [{symbols.value(i) for i in ids} for ids in result] == expected
+
+    print('{} revisions, {} identifiers, {} distinct'.format(
+        len(texts), sum(map(len, expected)), len(symbols)))
+    print('identifiers: {:8.1f} MiB'.format(identifiers_size / 2**20))
+    print('        ids: {:8.1f} MiB ({:.1f}x less)'.format(
+        ids_size / 2**20, identifiers_size / ids_size))
+
+
+if __name__ == '__main__':
+    main()
@@ -23,14 +23,16 @@ setup(
     },
     install_requires=[
         'Mako==1.0.2',
+        'lxml==3.5.0',
         'mediawiki-utilities==0.4.18',
         'mwcites==0.2.0',
         'mwcli==0.0.1',
         'mwtypes==0.2.0',
         'mwxml==0.2.0',
+        'numpy==1.11.0',
         'regex==2015.9.28',
         'more-itertools==2.2',
-        'fuzzywuzzy==0.8.0',
+        'fuzzywuzzy==0.18.0',
         'python-Levenshtein==0.12.0',
         'typing==3.5.0.1',
     ],
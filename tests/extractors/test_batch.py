@@ -0,0 +1,43 @@
+from wikidump.extractors import batch, misc
+
+import numpy
+
+
+TEXTS = [
+    '{{cite journal|doi=10.1000/foo|pmid=1}}',
+    'No identifiers here.',
+    'ISBN 0-19-853453-1 and doi:10.1000/foo and arXiv:1501.00001',
+]
+
+
+def test_extract_batch():
+    columns = batch.extract_batch(
+        TEXTS, page_ids=[10, 10, 20], revision_ids=[1, 2, 3])
+
+    assert list(columns.page_ids) == [10, 10, 20, 20, 20]
+    assert list(columns.revision_ids) == [1, 1, 3, 3, 3]
+    assert columns.value_table.count('10.1000/foo') == 1
+
+    rows = [
+        (columns.type_table[type_index], columns.value_table[value_index],
+         begin, end)
+        for type_index, value_index, begin, end
+        in zip(columns.types, columns.values, columns.begins, columns.ends)
+    ]
+    expected = [
+        (identifier.type, identifier.id, span.begin, span.end)
+        for text in TEXTS
+        for identifier, span in misc.pub_identifiers(text)
+    ]
+    assert rows == expected
+
+    assert batch.type_counts(columns) == {
+        'arxiv': 1, 'doi': 2, 'isbn': 1, 'pmid': 1, 'pmc': 0}
+
+
+def test_extract_batch_empty():
+    columns = batch.extract_batch(['Nothing.'])
+
+    assert len(columns.types) == 0
+    assert columns.begins.dtype == numpy.dtype('l')
+    assert columns.value_table == []
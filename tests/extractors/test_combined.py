@@ -0,0 +1,40 @@
+from wikidump.extractors import arxiv, combined, doi, isbn, pubmed
+
+import itertools
+
+
+def sequential(text):
+    return list(itertools.chain(
+        arxiv.extract(text),
+        doi.extract(text),
+        isbn.extract(text),
+        pubmed.extract(text),
+    ))
+
+
+def test_extract():
+    text = """
+    {{cite journal|doi=10.1000/foo(bar)|pmid = 1|pmc=PMC2}}.
+    [http://arxiv.org/abs/1501.00001v2 arXiv] and ARXIV: hep-th/9901001.
+    {{cite book|ISBN=978-3-16-148410-0}}, isbn 0-19-853453-1.
+    [http://www.ncbi.nlm.nih.gov/pubmed/3 ID], xpmid=4 is not an id.
+    Another link [https://www.ncbi.nlm.nih.gov/pmc/articles/PMC5 ID]
+    10.1000/10.1000/baz
+    """
+    assert list(combined.extract(text)) == sequential(text)
+
+
+def test_extract_longer_lowercase():
+    # "İ" is two characters once in lowercase
+    text = "İ {{cite|doi=10.1000/foo|PMID=1}} İ arxiv:1501.00001"
+    assert list(combined.extract(text)) == sequential(text)
+
+
+def test_extract_arrays():
+    text = "{{cite|doi=10.1000/foo|PMID=1|pmc=2}} arxiv:1501.00001 doi:10.1000/foo"
+    captures = combined.extract_arrays(text)
+
+    assert list(captures) == sequential(text)
+    assert [combined.TYPES[type_index] for type_index in captures.types] == \
+        ['arxiv', 'doi', 'doi', 'pmid', 'pmc']
+    assert captures.value_table.count('10.1000/foo') == 1
@@ -0,0 +1,85 @@
+from wikidump.extractors.common import (
+    CaptureResult, Captures, Identifier, Span, SpanIndex, SymbolTable)
+
+import random
+
+
+def test_span_index():
+    index = SpanIndex([Span(10, 20), Span(0, 5), Span(12, 30)])
+    assert len(index) == 3
+
+    assert index.contains(Span(0, 5))
+    assert index.contains(Span(11, 20))
+    assert index.contains(Span(15, 30))
+    assert not index.contains(Span(4, 6))
+    assert not index.contains(Span(5, 10))
+    assert not index.contains(Span(11, 31))
+
+    assert not SpanIndex([]).contains(Span(0, 0))
+
+
+def test_span_index_contains_all():
+    random.seed(0)
+
+    def random_span():
+        begin = random.randrange(100)
+        return Span(begin, begin + random.randrange(20))
+
+    for _ in range(100):
+        spans = [random_span() for _ in range(random.randrange(10))]
+        queries = [random_span() for _ in range(20)]
+        expected = [
+            any(query <= span for span in spans)
+            for query in queries
+        ]
+
+        index = SpanIndex(spans)
+        assert index.contains_all(queries) == expected
+        assert [index.contains(query) for query in queries] == expected
+
+
+def test_captures():
+    captures = Captures(('doi', 'isbn'))
+    captures.append(0, '10.1000/x', 0, 9)
+    captures.append(1, '123', 12, 15)
+    captures.append(0, '10.1000/x', 20, 29)
+
+    assert len(captures) == 3
+    assert captures.value_table == ['10.1000/x', '123']
+    assert list(captures.values) == [0, 1, 0]
+    assert list(captures) == [
+        CaptureResult(Identifier('doi', '10.1000/x'), Span(0, 9)),
+        CaptureResult(Identifier('isbn', '123'), Span(12, 15)),
+        CaptureResult(Identifier('doi', '10.1000/x'), Span(20, 29)),
+    ]
+    assert captures.distinct_identifiers() == {
+        Identifier('doi', '10.1000/x'),
+        Identifier('isbn', '123'),
+    }
+    assert captures.type_counts() == {'doi': 2, 'isbn': 1}
+
+
+def test_symbol_table():
+    symbols = SymbolTable()
+    doi = Identifier('doi', '10.1000/x')
+
+    assert symbols.id(doi) == 0
+    assert symbols.id(Identifier('isbn', '123')) == 1
+    assert symbols.id(Identifier('doi', '10.1000/x')) == 0
+    assert symbols.value(0) is doi
+    assert len(symbols) == 2 and doi in symbols
+
+    symbols.clear()
+    assert len(symbols) == 0 and doi not in symbols
+
+
+def test_captures_share_symbols():
+    symbols = SymbolTable()
+    first = Captures(('doi',), symbols)
+    first.append(0, '10.1000/x', 0, 9)
+    second = Captures(('doi',), symbols)
+    second.append(0, '10.1000/y', 0, 9)
+    second.append(0, '10.1000/x', 10, 19)
+
+    assert list(second.values) == [1, 0]
+    assert second.value_table == ['10.1000/x', '10.1000/y']
@@ -0,0 +1,59 @@
+from wikidump.extractors import combined, delta
+
+TEXT = """== Notes ==
+{{cite journal|doi=10.1000/foo(bar)|pmid = 1|pmc=PMC2}}.
+[http://arxiv.org/abs/1501.00001v2 arXiv] and ARXIV: hep-th/9901001.
+{{cite book|ISBN=978-3-16-148410-0}}, isbn 0-19-853453-1.
+[http://www.ncbi.nlm.nih.gov/pubmed/3 ID], xpmid=4 is not an id.
+10.1000/10.1000/baz
+"""
+
+
+def assert_same_as_full(text, previous):
+    extraction = delta.extract(text, previous)
+    assert list(extraction.captures()) == \
+        list(combined.extract_arrays(text))
+    return extraction
+
+
+def test_extract():
+    extraction = delta.extract(TEXT)
+    assert list(extraction.captures()) == list(combined.extract_arrays(TEXT))
+
+
+def test_extract_from_previous():
+    edits = [
+        TEXT,
+        TEXT.replace('pmid = 1', 'pmid = 12'),
+        TEXT.replace('pmid = 1', 'pmid = 12').replace('foo(bar)', 'foo'),
+        'New line.\n' + TEXT,
+        TEXT + 'isbn 1-2-3',
+        TEXT.replace('\n10.1000', '\n\n10.1000'),
+        TEXT.replace('{{cite book', '{{cite book|doi=10.1000/new'),
+        '',
+        TEXT,
+    ]
+    extraction = None
+    for text in edits:
+        extraction = assert_same_as_full(text, extraction)
+
+
+def test_extract_across_lines():
+    # The identifier is read on the next line
+    extraction = assert_same_as_full('x\npmid =\n123 y', None)
+    assert_same_as_full('x\npmid =\n124 y', extraction)
+
+    extraction = assert_same_as_full('10.1000/foo</\nref> bar', None)
+    assert_same_as_full('10.1000/foo</\nref bar', extraction)
+
+
+def test_safe_start():
+    text = 'pmid =\n1}}\n2 and 3'
+    assert delta.safe_start(text, len(text)) == text.index('2')
+    assert delta.safe_start(text, text.index('}')) == 0
+
+
+def test_common_affixes():
+    assert delta.common_prefix_length('abcd', 'abxd') == 2
+    assert delta.common_suffix_length('abcd', 'abxd', 2) == 1
+    assert delta.common_suffix_length('aaa', 'aaaa', 3) == 0
@@ -77,3 +77,15 @@ def test_extract():
         print(_, capture_begin, capture_end)
         assert 0 <= capture_begin < len(INPUT_TEXT)
         assert 0 <= capture_end < len(INPUT_TEXT)
+
+
+def test_doi_end():
+    text = 'doi=10.1170/foo[bar]{baz}(qux).|pmid=1'
+    assert doi.doi_end(text, len('doi=10.1170/')) == text.index('|')
+
+    text = '[http://dx.doi.org/10.1170/foo] <ref>'
+    assert doi.doi_end(text, text.index('foo')) == text.index(']')
+
+    text = '10.1170/foo<!--comment--> 10.1170/bar-->'
+    assert doi.doi_end(text, len('10.1170/')) == text.index('<!--')
+    assert doi.doi_end(text, text.index('bar')) == text.rindex('-->')
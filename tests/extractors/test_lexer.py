@@ -0,0 +1,40 @@
+from wikidump.extractors import lexer, misc
+
+from textwrap import dedent
+
+TEXT = dedent('''\
+    Preamble <!-- a comment -->
+    == Section ==
+    [[Link|anchor]] {{cite|title=[[Nested]]}}<ref>{{cite|doi=10.1000/x}}</REF>
+    ''')
+
+
+def test_tokens():
+    tokens = lexer.Tokens(TEXT)
+
+    assert [match.group(0) for match in tokens.comments] == \
+        ['<!-- a comment -->']
+    assert [match.group('section_name') for match in tokens.section_headers] \
+        == [' Section ']
+    assert [match.group(0) for match in tokens.references] == \
+        ['<ref>{{cite|doi=10.1000/x}}</REF>']
+    assert [match.group(0) for match in tokens.templates] == \
+        ['{{cite|title=[[Nested]]}}', '{{cite|doi=10.1000/x}}']
+    assert [match.group('link') for match in tokens.wikilinks] == \
+        ['Link', 'Nested']
+
+
+def test_tokens_scanned_once():
+    tokens = lexer.Tokens(TEXT)
+    assert tokens.templates is tokens.templates
+
+
+def test_shared_tokens():
+    tokens = lexer.Tokens(TEXT)
+    sections = list(misc.sections(TEXT, tokens=tokens))
+    wikilinks = list(misc.wikilinks(TEXT, iter(sections), tokens=tokens))
+
+    assert sections == list(misc.sections(TEXT))
+    assert [wikilink.link for wikilink, _ in wikilinks] == ['Link', 'Nested']
+    assert [template for template, _ in misc.templates(TEXT, tokens=tokens)] \
+        == [match.group(0) for match in tokens.templates]
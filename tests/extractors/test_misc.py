@@ -1,4 +1,8 @@
-from wikidump.extractors.misc import Section, sections, templates, references
+from wikidump.extractors import arxiv, doi, isbn, pubmed
+from wikidump.extractors.misc import (
+    INCIPIT, Section, Template, TemplateIndex, balanced_templates, sections,
+    templates, references, pub_identifiers, wikilinks)
+from wikidump.extractors.common import Span
 
 from .utils import assert_captures_in_text
 
@@ -41,6 +45,41 @@ def test_sections():
     assert_captures_in_text(captures, text)
 
 
+def test_sections_full_body():
+    text = 'Preamble\n== Section ==\nBody\n'
+    preamble, section = [capture.data
+                         for capture in sections(text, include_preamble=True)]
+
+    assert preamble.full_body == 'Preamble'
+    assert section.body == 'Body\n'
+    assert section.full_body == '== Section ==\nBody\n'
+    assert section == Section(name=' Section ', level=2, body='Body\n')
+
+
+def test_wikilinks_sections():
+    text = dedent('''\
+        [[Intro]]
+        == Section 1 ==
+        [[A|a]] and [[B]]
+        == Section 2 ==
+        [[C]]
+        ''')
+
+    captures = list(wikilinks(text, sections(text)))
+    found_links = [(capture.data.link, capture.data.section_name,
+                    capture.data.section_number) for capture in captures]
+
+    assert found_links == [
+        ('Intro', INCIPIT.name, 0),
+        ('A', ' Section 1 ', 1),
+        ('B', ' Section 1 ', 1),
+        ('C', ' Section 2 ', 2),
+    ]
+    # The links of a section share it
+    assert captures[1].data.section is captures[2].data.section
+    assert_captures_in_text(captures, text)
+
+
 def test_oneline_template():
     text = dedent('''\
         {{cite journal |vauthors = Poland GA, Jacobson RM | title = The Age-Old Struggle against the Antivaccinationists | journal = N Engl J Med | volume = 364 | pages = 97–9 | date = 13 January 2011 | pmid = 21226573 | doi = 10.1056/NEJMp1010594 | url = http://www.nejm.org/doi/full/10.1056/NEJMp1010594 | archiveurl = http://web.archive.org/web/20140423082318/http://www.nejm.org/doi/full/10.1056/NEJMp1010594 | archivedate = 23 April 2014 }}''')
@@ -102,6 +141,39 @@ def test_fucked_up_template():
     assert_captures_in_text(captures, text)
 
 
+def test_nested_templates():
+    text = 'a {{A|x={{B|{{C}}}} y}} b {{D {{E}} }}} {{unclosed {{F}} z'
+    captures = list(balanced_templates(text))
+
+    assert [(capture.data, text[slice(*capture.span)])
+            for capture in captures] == [
+        (Template(name='A', depth=0), '{{A|x={{B|{{C}}}} y}}'),
+        (Template(name='B', depth=1), '{{B|{{C}}}}'),
+        (Template(name='C', depth=2), '{{C}}'),
+        (Template(name='D', depth=0), '{{D {{E}} }}'),
+        (Template(name='E', depth=1), '{{E}}'),
+        (Template(name='F', depth=0), '{{F}}'),
+    ]
+    assert_captures_in_text(captures, text)
+
+
+def test_template_index():
+    text = 'a {{A|x={{B|{{C}}}} y}} b {{D {{E}} }}} {{unclosed {{F}} z'
+    index = TemplateIndex(text)
+    assert len(index) == 6
+
+    for offset in range(len(text)):
+        innermost = None
+        for template, span in index.templates:
+            if span.begin <= offset < span.end:
+                innermost = (template, span)
+        assert index.at(offset) == innermost
+
+    assert index.containing(Span(9, 20)).data.name == 'A'
+    assert index.containing(Span(13, 14)).data.name == 'C'
+    assert index.containing(Span(20, 30)) is None
+
+
 def test_references_with_quotes_and_double_quotes():
     text = dedent('''\
         <ref foo="bar" bar='foo' foobar='foo"b"ar'>test1</ref>''')
@@ -146,3 +218,21 @@ def test_multiline_reference():
     found_templates = [capture.data for capture in captures]
     assert found_templates == [text]
     assert_captures_in_text(captures, text)
+
+
+def test_pub_identifiers_prefilter():
+    extractors = (arxiv.extract, doi.extract, isbn.extract, pubmed.extract)
+    prefilter_stats = {'hits': 0, 'misses': 0}
+
+    text = 'See {{cite journal|DOI=10.1000/foo|PMID=1}}.'
+    identifiers = [
+        identifier
+        for identifier, _ in pub_identifiers(
+            text, extractors, prefilter_stats=prefilter_stats)
+    ]
+    assert [identifier.type for identifier in identifiers] == ['doi', 'pmid']
+    assert prefilter_stats == {'hits': 1, 'misses': 0}
+
+    text = 'Lorem ipsum, no identifiers here.'
+    assert list(pub_identifiers(text, prefilter_stats=prefilter_stats)) == []
+    assert prefilter_stats == {'hits': 1, 'misses': 1}
@@ -0,0 +1,172 @@
+from wikidump import __main__ as wikidump_main, checkpoints
+from wikidump.processors import identifiers_extractor
+
+import gzip
+import pathlib
+import sys
+
+import pytest
+import regex
+
+
+def write_and_resume(path, compression):
+    output = checkpoints.ResumableWriter(path, compression)
+    output.write('header\n')
+    output.write('page 1\n')
+    offset = output.checkpoint()
+    output.write('page 2, lost in a crash')
+    output.checkpoint()
+    output.close()
+
+    output = checkpoints.ResumableWriter(path, compression, offset=offset)
+    output.write('header\n')
+    output.start()
+    output.write('page 2\n')
+    output.close()
+
+
+def test_resume(tmpdir):
+    path = str(tmpdir.join('features.xml'))
+    write_and_resume(path, None)
+
+    with open(path) as f:
+        assert f.read() == 'header\npage 1\npage 2\n'
+
+
+def test_resume_gzip(tmpdir):
+    path = str(tmpdir.join('features.xml'))
+    write_and_resume(path, 'gzip')
+
+    with gzip.open(path + '.gz', 'rt') as f:
+        assert f.read() == 'header\npage 1\npage 2\n'
+
+
+def test_save_and_load(tmpdir):
+    path = checkpoints.checkpoint_path(
+        pathlib.Path(str(tmpdir)), 'dump.xml')
+    assert checkpoints.load(path) is None
+
+    checkpoint = checkpoints.Checkpoint(12, 345, {'pages_analyzed': 3}, None)
+    checkpoints.save(path, checkpoint)
+    assert checkpoints.load(path) == checkpoint
+
+
+DUMP_HEAD = '''\
+<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/">
+  <siteinfo>
+    <sitename>Wikipedia</sitename>
+  </siteinfo>
+'''
+
+PAGE = '''\
+  <page>
+    <title>Page {page_id}</title>
+    <ns>0</ns>
+    <id>{page_id}</id>
+    <revision>
+      <id>{page_id}1</id>
+      <timestamp>2015-01-0{page_id}T10:00:00Z</timestamp>
+      <contributor>
+        <username>User</username>
+        <id>1</id>
+      </contributor>
+      <text xml:space="preserve">{{{{cite|doi=10.1000/{page_id}}}}}</text>
+    </revision>
+    <revision>
+      <id>{page_id}2</id>
+      <parentid>{page_id}1</parentid>
+      <timestamp>2015-01-0{page_id}T11:00:00Z</timestamp>
+      <contributor>
+        <username>User</username>
+        <id>1</id>
+      </contributor>
+      <text xml:space="preserve">{{{{cite|pmid={page_id}}}}}</text>
+    </revision>
+  </page>
+'''
+
+
+class Crash(Exception):
+    pass
+
+
+class Clock:
+    """A clock which moves on by a second every time it is read."""
+
+    def __init__(self):
+        self.now = 0
+
+    def monotonic(self):
+        self.now += 1
+        return self.now
+
+
+def analyze(monkeypatch, dump_path, output_dir, *options):
+    monkeypatch.setattr(sys, 'argv', [
+        'wikidump', str(dump_path), str(output_dir),
+        '--checkpoint-interval', '0.5', *options,
+        'extract-identifiers',
+    ])
+    wikidump_main.analyze_file(dump_path, wikidump_main.get_args())
+
+
+def read_outputs(output_dir, compression):
+    features_path = output_dir.join('dump.xml.features.xml')
+    stats_path = output_dir.join('dump.xml.stats.xml')
+    if compression == 'gzip':
+        with gzip.open(str(features_path) + '.gz', 'rt') as f:
+            features = f.read()
+        with gzip.open(str(stats_path) + '.gz', 'rt') as f:
+            stats = f.read()
+    else:
+        features = features_path.read()
+        stats = stats_path.read()
+    stats = regex.sub(r'<(start|end)_time>[^<]*', '', stats)
+    return features, stats
+
+
+@pytest.mark.parametrize('compression', [None, 'gzip'])
+def test_resume_after_crash(monkeypatch, tmpdir, compression):
+    dump_path = pathlib.Path(str(tmpdir.join('dump.xml')))
+    dump_path.write_text(
+        DUMP_HEAD
+        + ''.join(PAGE.format(page_id=page_id) for page_id in range(1, 5))
+        + '</mediawiki>\n')
+    options = []
+    if compression is not None:
+        options = ['--output-compression', compression]
+    monkeypatch.setattr(checkpoints, 'time', Clock())
+
+    uninterrupted_dir = tmpdir.mkdir('uninterrupted')
+    analyze(monkeypatch, dump_path, uninterrupted_dir, *options)
+
+    # Crash in the middle of the third page, once its first revision has
+    # been written
+    revision_identifiers = identifiers_extractor.revision_identifiers
+
+    def crashing_revision_identifiers(mw_revision, *args, **kwargs):
+        if mw_revision.id == 32:
+            raise Crash()
+        return revision_identifiers(mw_revision, *args, **kwargs)
+
+    resumed_dir = tmpdir.mkdir('resumed')
+    with monkeypatch.context() as patch:
+        patch.setattr(identifiers_extractor, 'revision_identifiers',
+                      crashing_revision_identifiers)
+        with pytest.raises(Crash):
+            analyze(monkeypatch, dump_path, resumed_dir, *options)
+    checkpoint = checkpoints.load(checkpoints.checkpoint_path(
+        pathlib.Path(str(resumed_dir)), 'dump.xml'))
+    assert checkpoint.page_id == 2
+    # Some data past the checkpoint, e.g. a write torn by the crash
+    features_path = str(resumed_dir.join('dump.xml.features.xml'))
+    if compression == 'gzip':
+        features_path += '.gz'
+    with open(features_path, 'ab') as f:
+        f.write(b'<page>torn' * 1000)
+
+    analyze(monkeypatch, dump_path, resumed_dir, '--resume', *options)
+
+    assert read_outputs(resumed_dir, compression) == \
+        read_outputs(uninterrupted_dir, compression)
+    assert not resumed_dir.join('dump.xml.checkpoint').exists()
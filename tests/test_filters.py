@@ -0,0 +1,57 @@
+from wikidump import filters, manifest
+
+import io
+
+from .test_page_scanner import DUMP
+
+
+def filtered_ids(page_filter):
+    data = filters.filter_pages(io.BytesIO(DUMP), page_filter).read()
+    assert data.startswith(b'<mediawiki')
+    assert data.endswith(b'</mediawiki>\n')
+    return [int(line.strip()[4:-5]) for line in data.splitlines()
+            if line.startswith(b'    <id>')]
+
+
+def test_filter_pages():
+    assert filtered_ids(filters.PageFilter()) == [1, 2]
+    assert filtered_ids(filters.PageFilter(namespaces=[0])) == [1]
+    assert filtered_ids(filters.PageFilter(namespaces=[2])) == []
+    assert filtered_ids(filters.PageFilter(titles=['Bar'])) == [2]
+    assert filtered_ids(filters.PageFilter(titles=['Bar'], page_ids=[1])) \
+        == [1, 2]
+    assert filtered_ids(
+        filters.PageFilter(namespaces=[0], titles=['Bar'])) == []
+
+
+def test_filter_pages_only_last_revision():
+    data = filters.filter_pages(
+        io.BytesIO(DUMP),
+        filters.PageFilter(),
+        only_last_revision=True,
+    ).read()
+
+    first_revision = DUMP.index(b'    <revision>')
+    second_revision = DUMP.index(b'    <revision>', first_revision + 1)
+    assert data == DUMP[:first_revision] + DUMP[second_revision:]
+
+
+def test_filter_pages_manifest():
+    page_manifest = manifest.Manifest({
+        1: manifest.PageState(revision_id=10, state=None),
+        2: manifest.PageState(revision_id=12, state=None),
+    })
+    data = filters.filter_pages(
+        io.BytesIO(DUMP),
+        filters.PageFilter(),
+        page_manifest=page_manifest,
+    ).read()
+
+    # Only the revision 11 is new, the page 2 has no new revisions
+    first_revision = DUMP.index(b'    <revision>')
+    second_revision = DUMP.index(b'    <revision>', first_revision + 1)
+    second_page = DUMP.index(b'  <page>', second_revision)
+    footer = DUMP.index(b'</mediawiki>')
+    assert data == (DUMP[:first_revision]
+                    + DUMP[second_revision:second_page]
+                    + DUMP[footer:])
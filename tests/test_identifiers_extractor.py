@@ -0,0 +1,44 @@
+import collections
+
+from wikidump import utils
+from wikidump.extractors.common import Span
+from wikidump.processors import identifiers_extractor
+
+Revision = collections.namedtuple('Revision', ['text', 'sha1'])
+
+TEXT = '== References <!-- keep --> ==\n' \
+    '{{cite|doi=10.1000/ab<!--x-->cd}} ISBN<!-- -->0-306-40615-2'
+
+
+def test_revision_identifiers_skip_comments():
+    section_names = []
+
+    def section_filter(section):
+        section_names.append(section.name)
+        return section.name.strip() == 'References'
+
+    features = identifiers_extractor.revision_identifiers(
+        Revision(TEXT, None),
+        previous=None,
+        section_filter=section_filter,
+        prefilter_stats=collections.Counter(),
+    )
+
+    assert section_names == ['', ' References  ']
+    assert sorted((identifier.type, identifier.id)
+                  for identifier in features.identifiers_filtered) == \
+        [('doi', '10.1000/abcd'), ('isbn', '0306406152')]
+
+
+def test_original_spans():
+    comments = utils.CommentMask(TEXT)
+    begin = comments.text.index('10.1000')
+    end = comments.text.index('}}')
+    spans = identifiers_extractor.original_spans(
+        comments, [Span(begin, end)])
+    assert [TEXT[begin:end] for begin, end in spans] == \
+        ['10.1000/ab<!--x-->cd']
+
+    comments = utils.CommentMask('no comments')
+    assert identifiers_extractor.original_spans(
+        comments, [Span(3, 11)]) == [(3, 11)]
@@ -0,0 +1,37 @@
+from wikidump.processors import identifiers_history_extractor as history
+
+Interval = history.Interval
+Revision = history.Revision
+
+
+def test_identifier_intervals():
+    revisions = [
+        Revision(1, '2015-01-01', {1, 2}),
+        Revision(2, '2015-01-02', {2}),
+        Revision(3, '2015-01-03', {1, 2}),
+        Revision(4, '2015-01-04', {3}),
+        Revision(5, '2015-01-05', {3}),
+    ]
+    assert list(history.identifier_intervals(revisions)) == [
+        Interval(1, '2015-01-01', '2015-01-02'),
+        Interval(1, '2015-01-03', '2015-01-04'),
+        Interval(2, '2015-01-01', '2015-01-04'),
+        Interval(3, '2015-01-04', None),
+    ]
+
+
+def test_sorted_revisions(monkeypatch):
+    revisions = [
+        Revision(3, '2015-01-02', {1}),
+        Revision(1, '2015-01-01', {2}),
+        Revision(2, '2015-01-02', set()),
+    ]
+    assert list(history.sorted_revisions(revisions)) == \
+        [revisions[1], revisions[2], revisions[0]]
+    assert list(history.sorted_revisions(sorted(revisions))) == \
+        sorted(revisions)
+
+    # On disk
+    monkeypatch.setattr(history, 'SPOOL_SIZE', 1)
+    assert list(history.sorted_revisions(revisions)) == \
+        [revisions[1], revisions[2], revisions[0]]
@@ -0,0 +1,44 @@
+from wikidump import index, page_scanner
+
+import io
+
+from .test_page_scanner import DUMP
+
+
+def build_index(tmpdir):
+    path = str(tmpdir.join('dump.xml.index'))
+    with open(path, 'wb') as output_h:
+        index.write_index(index.scan_pages(io.BytesIO(DUMP)), output_h)
+    return index.PageIndex(path)
+
+
+def test_lookup(tmpdir):
+    page_index = build_index(tmpdir)
+
+    assert len(page_index) == 2
+
+    foo = page_index.by_title('Foo')
+    assert foo.id == 1
+    assert foo.revisions == 2
+    page = DUMP[foo.offset:foo.offset + foo.length]
+    assert page.startswith(b'  <page>\n')
+    assert page.endswith(b'</page>\n')
+
+    assert page_index.by_id(2) == page_index.by_title('Bar')
+    assert page_index.by_id(3) is None
+    assert page_index.by_title('Baz') is None
+
+
+def test_select_pages(tmpdir):
+    page_index = build_index(tmpdir)
+    bar = page_index.by_title('Bar')
+
+    # A seekable and a non seekable stream
+    for xml_stream in (io.BytesIO(DUMP), page_scanner.stream([DUMP])):
+        selected = index.select_pages(xml_stream, page_index, page_ids=[2])
+        data = selected.read()
+
+        assert data.startswith(DUMP[:page_index.header_length])
+        assert DUMP[bar.offset:bar.offset + bar.length] in data
+        assert b'<title>Foo</title>' not in data
+        assert data.endswith(b'</mediawiki>\n')
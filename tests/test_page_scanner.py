@@ -0,0 +1,62 @@
+from wikidump import page_scanner
+
+import io
+
+from textwrap import dedent
+
+DUMP = dedent('''\
+    <mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/">
+      <siteinfo>
+        <sitename>Wikipedia</sitename>
+      </siteinfo>
+      <page>
+        <title>Foo</title>
+        <ns>0</ns>
+        <id>1</id>
+        <revision>
+          <id>10</id>
+          <text xml:space="preserve">&lt;page&gt; is escaped</text>
+        </revision>
+        <revision>
+          <id>11</id>
+          <text xml:space="preserve" />
+        </revision>
+      </page>
+      <page>
+        <title>Bar</title>
+        <ns>1</ns>
+        <id>2</id>
+        <revision>
+          <id>12</id>
+        </revision>
+      </page>
+    </mediawiki>
+    ''').encode('utf-8')
+
+
+def test_scan():
+    segments = list(page_scanner.scan(io.BytesIO(DUMP)))
+
+    assert [segment.kind for segment in segments] == [
+        page_scanner.HEADER,
+        page_scanner.PAGE_HEAD,
+        page_scanner.REVISION,
+        page_scanner.REVISION,
+        page_scanner.PAGE_TAIL,
+        page_scanner.PAGE_HEAD,
+        page_scanner.REVISION,
+        page_scanner.PAGE_TAIL,
+        page_scanner.FOOTER,
+    ]
+    assert segments[1].data.startswith(b'  <page>\n')
+    assert segments[2].data.startswith(b'    <revision>\n')
+    assert segments[-1].data == b'</mediawiki>\n'
+
+
+def test_scan_small_blocks():
+    for block_size in (1, 5, 11):
+        segments = list(page_scanner.scan(io.BytesIO(DUMP), block_size))
+
+        assert b''.join(segment.data for segment in segments) == DUMP
+        for offset, data in ((s.offset, s.data) for s in segments):
+            assert DUMP[offset:offset + len(data)] == data
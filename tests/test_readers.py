@@ -0,0 +1,31 @@
+from wikidump import readers
+
+import io
+
+import mwxml
+
+from .test_page_scanner import DUMP
+
+
+def read(dump):
+    return [
+        (page.id, page.title, page.namespace, [
+            (revision.id, revision.parent_id, revision.text)
+            for revision in page
+        ])
+        for page in dump
+    ]
+
+
+def test_lxml_reader():
+    lxml_dump = readers.open_dump(io.BytesIO(DUMP), 'lxml')
+    mwxml_dump = mwxml.Dump.from_file(io.BytesIO(DUMP))
+
+    assert lxml_dump.site_info.name == 'Wikipedia'
+    assert read(lxml_dump) == read(mwxml_dump)
+
+
+def test_lxml_reader_skips_revisions():
+    dump = readers.open_dump(io.BytesIO(DUMP), 'lxml')
+
+    assert [page.title for page in dump] == ['Foo', 'Bar']
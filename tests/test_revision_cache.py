@@ -0,0 +1,38 @@
+import collections
+
+from wikidump import revision_cache
+
+Revision = collections.namedtuple('Revision', ['text', 'sha1'])
+
+SHA1 = 'phoiac9h4m842xq45sp7s6u21eteeq1'
+
+
+def test_content_key():
+    assert revision_cache.content_key(Revision('a', SHA1)) == SHA1
+    # Not a sha1 of the dumps, the text is hashed
+    assert revision_cache.content_key(Revision('a', 'dummy')) == \
+        revision_cache.content_key(Revision('a', None))
+    assert revision_cache.content_key(Revision('a', None)) != \
+        revision_cache.content_key(Revision('b', None))
+    assert revision_cache.content_key(Revision(None, None)) == \
+        revision_cache.content_key(Revision('', None))
+
+
+def test_get():
+    stats = {'cache_hits': 0}
+    cache = revision_cache.RevisionCache(size=2, stats=stats)
+    extracted = []
+
+    def get(text):
+        return cache.get(Revision(text, None),
+                         lambda: extracted.append(text) or text.upper())
+
+    assert [get(text) for text in 'abab'] == ['A', 'B', 'A', 'B']
+    assert extracted == ['a', 'b']
+    assert stats['cache_hits'] == cache.hits == 2
+
+    # "a" is the least recently used
+    get('c')
+    get('a')
+    assert extracted == ['a', 'b', 'c', 'a']
+    assert len(cache) == 2
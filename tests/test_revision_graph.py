@@ -0,0 +1,71 @@
+from wikidump import revision_graph
+
+
+def graph_of(revisions):
+    graph = revision_graph.RevisionGraph()
+    for revision in revisions:
+        graph.add(*revision)
+    return graph
+
+
+def ids(graph, indexes):
+    return [graph.ids[index] for index in indexes]
+
+
+def test_parents():
+    graph = graph_of([
+        (2, 1, 20),
+        (1, None, 10),
+        (4, 3, 40),
+    ])
+    assert list(graph.parents) == [1, revision_graph.NO_PARENT,
+                                   revision_graph.NO_PARENT]
+    assert ids(graph, graph.missing_parents()) == [4]
+
+
+def test_topological_order():
+    graph = graph_of([
+        # The child has an earlier timestamp than its parent
+        (3, 2, 15),
+        (2, 1, 20),
+        (1, None, 10),
+        (5, 1, 30),
+        (4, 1, 30),
+    ])
+    assert ids(graph, graph.timestamp_order()) == [1, 3, 2, 4, 5]
+    assert ids(graph, graph.topological_order()) == [1, 2, 3, 4, 5]
+
+
+def test_topological_order_cycle():
+    graph = graph_of([
+        (1, None, 10),
+        (3, 2, 30),
+        (2, 3, 20),
+    ])
+    assert ids(graph, graph.topological_order()) == [1, 2, 3]
+
+
+def test_reverts():
+    graph = graph_of([
+        (1, None, 10, 'a'),
+        (2, 1, 20, 'b'),
+        (3, 2, 30, 'c'),
+        # Revert of 2 and 3
+        (4, 3, 40, 'a'),
+        (5, 4, 50, 'a'),
+        (6, 5, 60, 'd'),
+        # Not a revert, "b" has been reverted
+        (7, 6, 70, 'b'),
+        (8, 7, 80, None),
+        # Revert of 7 and 8
+        (9, 8, 90, 'd'),
+    ])
+    reverts = [
+        (graph.ids[revert.reverting], graph.ids[revert.reverted_to],
+         ids(graph, revert.reverteds))
+        for revert in graph.reverts()
+    ]
+    assert reverts == [(4, 1, [2, 3]), (9, 6, [7, 8])]
+    assert ids(graph, [index for index, reverted
+                       in enumerate(graph.reverted()) if reverted]) == \
+        [2, 3, 7, 8]
@@ -0,0 +1,89 @@
+import fuzzywuzzy.process
+
+from wikidump import languages, section_classifier
+
+SECTION_NAMES = [
+    'References',
+    'references',
+    ' REFERENCES: ',
+    'Refrences',
+    'Further reading and sources',
+    'External links',
+    'See also',
+    'Notes and references',
+    '!!',
+    '',
+]
+
+
+def test_same_as_fuzzywuzzy():
+    synonyms = languages.bibliography['en']
+    for score_cutoff in (91, 60):
+        classifier = section_classifier.SectionClassifier(
+            synonyms, score_cutoff)
+        for section_name in SECTION_NAMES:
+            match = fuzzywuzzy.process.extractOne(
+                section_name, synonyms, score_cutoff=score_cutoff)
+            assert classifier(section_name) == bool(match), section_name
+
+
+def test_counters():
+    classifier = section_classifier.SectionClassifier(
+        languages.bibliography['en'], 91, cache_size=2)
+
+    assert classifier('references')
+    assert classifier(' References ')
+    assert not classifier('History')
+    assert not classifier('History')
+    assert not classifier('Early life')
+    assert classifier('Refrences')
+
+    assert classifier.counters == {
+        'exact': 1, 'normalized': 1, 'scored': 3, 'cached': 1}
+    assert list(classifier.cache) == ['Early life', 'Refrences']
+    assert classifier.hit_rate() == 0.5
+    assert section_classifier.hit_rate(classifier.counters) == 0.5
+    assert section_classifier.hit_rate({}) == 0.
+
+
+def test_save_cache(tmpdir):
+    path = tmpdir.join('section-names.cache')
+    synonyms = languages.bibliography['en']
+    classifier = section_classifier.SectionClassifier(synonyms, 91)
+    classifier('History')
+    classifier.save_cache(path)
+
+    classifier = section_classifier.SectionClassifier(synonyms, 91)
+    classifier.load_cache(path)
+    assert not classifier('History')
+    assert classifier.counters == {'cached': 1}
+
+    # Saved with another cutoff
+    classifier = section_classifier.SectionClassifier(synonyms, 80)
+    classifier.load_cache(path)
+    assert not classifier.cache
+
+
+def test_save_cache_merges(tmpdir):
+    path = tmpdir.join('section-names.cache')
+    synonyms = languages.bibliography['en']
+    first = section_classifier.SectionClassifier(synonyms, 91, cache_size=3)
+    second = section_classifier.SectionClassifier(synonyms, 91, cache_size=3)
+    first('History')
+    first('Early life')
+    second('Refrences')
+    first.save_cache(path)
+    second.save_cache(path)
+
+    classifier = section_classifier.SectionClassifier(
+        synonyms, 91, cache_size=3)
+    classifier.load_cache(path)
+    assert list(classifier.cache) == ['History', 'Early life', 'Refrences']
+
+    # The answers saved by the other classifiers are the oldest ones
+    second('Career')
+    second.save_cache(path)
+    classifier = section_classifier.SectionClassifier(
+        synonyms, 91, cache_size=3)
+    classifier.load_cache(path)
+    assert list(classifier.cache) == ['Early life', 'Refrences', 'Career']
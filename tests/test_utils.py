@@ -0,0 +1,39 @@
+from wikidump import utils
+from wikidump.extractors import lexer
+
+
+def test_remove_comments():
+    text = 'a<!-- b -->c<!--\nd\n-->e'
+    assert utils.remove_comments(text) == 'ace'
+
+    text = 'No comments'
+    assert utils.remove_comments(text) is text
+
+
+def test_comment_mask():
+    text = 'a<!-- b -->c<!--\nd\n-->e'
+    comments = utils.CommentMask(text)
+
+    assert comments.text == 'ace'
+    assert [text[comments.original_offset(i)] for i in range(3)] == \
+        ['a', 'c', 'e']
+    # The comments inside the span are part of it
+    assert comments.original_span(0, 2) == (0, 12)
+    assert comments.original_span(1, 1) == (11, 11)
+
+    text = 'No comments'
+    comments = utils.CommentMask(text)
+    assert comments.text is text
+    assert comments.original_span(3, 11) == (3, 11)
+
+
+def test_comment_mask_of_tokens():
+    text = 'a<!-- b -->c<!--\nd\n-->e'
+    tokens = lexer.Tokens(text)
+    comments = utils.CommentMask(text, tokens.comments)
+
+    assert comments.text == 'ace'
+    assert comments.original_span(0, 2) == (0, 12)
+
+    text = 'No comments'
+    assert utils.CommentMask(text, lexer.Tokens(text).comments).text is text
@@ -1,17 +1,30 @@
 """Main module that parses command line arguments."""
 import argparse
 import codecs
+import collections
+import concurrent.futures
 import os
 import subprocess
+import sys
 import gzip
 import io
+import time
+import traceback
 
 import mw.xml_dump
-import mwxml
 import pathlib
 from typing import IO, Optional, Union
 
-from . import processors, utils
+from . import (
+    checkpoints, chunks, filters, index, manifest, processors, readers,
+    utils)
+
+FileReport = collections.namedtuple('FileReport', [
+    'path',
+    'size',
+    'elapsed',
+    'error',
+])
 
 
 def open_xml_file(path: Union[str, IO]):
@@ -81,6 +94,101 @@ def get_args():
         action='store_true',
         help="Don't write any file",
     )
+    parser.add_argument(
+        '--jobs', '-j',
+        metavar='N',
+        type=int,
+        default=1,
+        help='Number of worker processes (default: 1).',
+    )
+    parser.add_argument(
+        '--chunk-size',
+        metavar='MiB',
+        type=float,
+        required=False,
+        default=None,
+        help='Split each file in page-aligned chunks of about this size, '
+             'which are processed in parallel.',
+    )
+    parser.add_argument(
+        '--reader',
+        choices=sorted(readers.READERS),
+        default='mwxml',
+        help='The XML reader to use (default: mwxml). The lxml reader is '
+             'faster.',
+    )
+    parser.add_argument(
+        '--checkpoint-interval',
+        metavar='SECONDS',
+        type=float,
+        default=600,
+        help='Save a checkpoint of the run every SECONDS, 0 to disable '
+             '(default: 600). Not supported with --chunk-size and 7z '
+             'compression.',
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Resume the run from the last checkpoint saved, appending to '
+             'the existing outputs.',
+    )
+    parser.add_argument(
+        '--save-manifest',
+        action='store_true',
+        help='Save the manifest of the run in the output directory, to '
+             'extract incrementally from the next dumps.',
+    )
+    parser.add_argument(
+        '--incremental',
+        metavar='MANIFEST',
+        type=pathlib.Path,
+        required=False,
+        default=None,
+        help='Process only the revisions newer than the ones in the manifest '
+             'of a previous run, and output just the delta. The updated '
+             'manifest is saved in the output directory.',
+    )
+    parser.add_argument(
+        '--pages',
+        metavar='TITLE',
+        action='append',
+        default=[],
+        help='Process only the page with this title (can be repeated). '
+             'The other pages are skipped without reading them if the dump '
+             'has been indexed.',
+    )
+    parser.add_argument(
+        '--page-ids',
+        metavar='ID',
+        type=int,
+        action='append',
+        default=[],
+        help='Process only the page with this id (can be repeated). '
+             'The other pages are skipped without reading them if the dump '
+             'has been indexed.',
+    )
+    parser.add_argument(
+        '--namespaces',
+        metavar='NS',
+        type=int,
+        nargs='+',
+        default=[0],
+        help='Process only the pages in these namespaces (default: 0).',
+    )
+    parser.add_argument(
+        '--skip-redirects',
+        action='store_true',
+        help='Skip the pages which are redirects.',
+    )
+    parser.add_argument(
+        '--index-dir',
+        metavar='DIR',
+        type=pathlib.Path,
+        required=False,
+        default=None,
+        help='Directory of the indexes built by the "index" sub-command '
+             '(default: OUTPUT_DIR).',
+    )
 
     subparsers = parser.add_subparsers(help='sub-commands help')
     processors.bibliography_extractor.configure_subparsers(subparsers)
@@ -89,47 +197,278 @@ def get_args():
     processors.page_ids_extractor.configure_subparsers(subparsers)
     processors.identifiers_history_extractor.configure_subparsers(subparsers)
     processors.wikilink_extractor.configure_subparsers(subparsers)
+    index.configure_subparsers(subparsers)
 
     parsed_args = parser.parse_args()
     if 'func' not in parsed_args:
         parser.print_usage()
         parser.exit(1)
+    if parsed_args.resume and (parsed_args.chunk_size
+                               or parsed_args.output_compression == '7z'
+                               or not parsed_args.checkpoint_interval):
+        parser.error('--resume needs checkpoints, which are not supported '
+                     'with --chunk-size and 7z compression')
+    if parsed_args.incremental or parsed_args.save_manifest:
+        if not getattr(parsed_args, 'supports_manifest', False):
+            parser.error('the sub-command does not support manifests')
+        if parsed_args.chunk_size:
+            parser.error('manifests are not supported with --chunk-size')
 
     return parsed_args
 
 
-def main():
-    """Main function."""
-    args = get_args()
-    
-    if not args.output_dir_path.exists():
-        args.output_dir_path.mkdir(parents=True)
+def open_input_file(
+        input_file_path: pathlib.Path,
+        args,
+        start_after: Optional[int]=None,
+        page_manifest: Optional[manifest.Manifest]=None) -> IO[bytes]:
+    """Open a dump file, keeping only the pages accepted by the filters.
 
-    for input_file_path in args.files:
-        utils.log("Analyzing {}...".format(input_file_path))
+    The processors run with --only-last-revision get only the last
+    revision of every page: the others are skipped as raw bytes.
 
-        dump = mwxml.Dump.from_file(open_xml_file(str(input_file_path)))
+    With start_after, the pages up to the one with this id are skipped.
+    With page_manifest, the revisions already processed are skipped.
 
-        basename = input_file_path.name
+    When single pages are requested and the dump has been indexed, the
+    other pages are not even read.
+    """
+    index_dir = args.index_dir or args.output_dir_path
+    index_path = index.index_path(index_dir, input_file_path)
 
-        if args.dry_run:
-            pages_output = open(os.devnull, 'wt')
-            stats_output = open(os.devnull, 'wt')
+    if (args.pages or args.page_ids) and index_path.exists():
+        if input_file_path.suffix == '.xml':
+            # Uncompressed dumps can be read at any offset
+            xml_stream = open(str(input_file_path), 'rb')
         else:
-            pages_output = output_writer(
-                path=str(args.output_dir_path/(basename + '.features.xml')),
-                compression=args.output_compression,
-            )
-            stats_output = output_writer(
-                path=str(args.output_dir_path/(basename + '.stats.xml')),
-                compression=args.output_compression,
-            )
+            xml_stream = open_xml_file(str(input_file_path))
+        xml_stream = index.select_pages(
+            xml_stream,
+            index.PageIndex(index_path),
+            titles=args.pages,
+            page_ids=args.page_ids,
+        )
+    else:
+        xml_stream = open_xml_file(str(input_file_path))
+
+    return filters.filter_pages(
+        xml_stream,
+        filters.get_page_filter(args),
+        only_last_revision=getattr(args, 'only_last_revision', False),
+        start_after=start_after,
+        page_manifest=page_manifest,
+    )
+
+
+def analyze_file(input_file_path: pathlib.Path, args) -> None:
+    """Run the selected processor on a single dump file."""
+    page_manifest = None
+    if args.incremental:
+        page_manifest = manifest.Manifest.load(args.incremental)
+    elif args.save_manifest:
+        page_manifest = manifest.Manifest()
+
+    if args.dry_run or args.chunk_size \
+            or args.output_compression == '7z' \
+            or not args.checkpoint_interval:
+        analyze_file_at_once(input_file_path, args, page_manifest)
+    else:
+        analyze_file_with_checkpoints(input_file_path, args, page_manifest)
+
+    if page_manifest is not None and not args.dry_run:
+        page_manifest.save(manifest.manifest_path(
+            args.output_dir_path, input_file_path.name))
+
+
+def analyze_file_at_once(
+        input_file_path: pathlib.Path,
+        args,
+        page_manifest: Optional[manifest.Manifest]=None) -> None:
+    """Run the selected processor on a dump file, without checkpoints."""
+    xml_stream = open_input_file(
+        input_file_path, args, page_manifest=page_manifest)
+
+    basename = input_file_path.name
+
+    if args.dry_run:
+        pages_output = open(os.devnull, 'wt')
+        stats_output = open(os.devnull, 'wt')
+    else:
+        pages_output = output_writer(
+            path=str(args.output_dir_path/(basename + '.features.xml')),
+            compression=args.output_compression,
+        )
+        stats_output = output_writer(
+            path=str(args.output_dir_path/(basename + '.stats.xml')),
+            compression=args.output_compression,
+        )
+
+    if args.chunk_size:
+        chunks.run(xml_stream, pages_output, stats_output, args)
+    else:
+        kwargs = {}
+        if page_manifest is not None:
+            kwargs['page_manifest'] = page_manifest
         args.func(
-            dump,
+            readers.open_dump(xml_stream, args.reader),
             pages_output,
             stats_output,
             args,
+            **kwargs
+        )
+
+
+def analyze_file_with_checkpoints(
+        input_file_path: pathlib.Path,
+        args,
+        page_manifest: Optional[manifest.Manifest]=None) -> None:
+    """Run the selected processor on a dump file, saving checkpoints.
+
+    With --resume, the run starts again from the last checkpoint saved.
+    """
+    basename = input_file_path.name
+    checkpoint_path = checkpoints.checkpoint_path(
+        args.output_dir_path, basename)
+
+    checkpoint = checkpoints.load(checkpoint_path) if args.resume else None
+    if checkpoint is None:
+        checkpoint = checkpoints.Checkpoint(
+            page_id=None,
+            features_offset=None,
+            stats=args.new_stats() if hasattr(args, 'new_stats') else None,
+            manifest=None,
         )
+    else:
+        utils.log('Resuming after page', checkpoint.page_id)
+        if page_manifest is not None and checkpoint.manifest is not None:
+            page_manifest.updates = checkpoint.manifest
+
+    xml_stream = open_input_file(
+        input_file_path,
+        args,
+        start_after=checkpoint.page_id,
+        page_manifest=page_manifest,
+    )
+
+    pages_output = checkpoints.ResumableWriter(
+        path=str(args.output_dir_path/(basename + '.features.xml')),
+        compression=args.output_compression,
+        offset=checkpoint.features_offset,
+    )
+    stats_output = output_writer(
+        path=str(args.output_dir_path/(basename + '.stats.xml')),
+        compression=args.output_compression,
+    )
+
+    dump = checkpoints.CheckpointedDump(
+        readers.open_dump(xml_stream, args.reader),
+        features_output=pages_output,
+        stats=checkpoint.stats,
+        path=checkpoint_path,
+        interval=args.checkpoint_interval,
+        page_manifest=page_manifest,
+    )
+    kwargs = {}
+    if checkpoint.stats is not None:
+        kwargs['stats'] = checkpoint.stats
+    if page_manifest is not None:
+        kwargs['page_manifest'] = page_manifest
+    args.func(dump, pages_output, stats_output, args, **kwargs)
+
+    # The run is complete, there is nothing to resume
+    if checkpoint_path.exists():
+        checkpoint_path.unlink()
+
+
+def process_file(input_file_path: pathlib.Path, args) -> FileReport:
+    """Process a single dump file.
+
+    Errors are not raised but reported back, so that a failure on a file
+    doesn't stop the processing of the others.
+    """
+    utils.log("Analyzing {}...".format(input_file_path))
+    start = time.monotonic()
+    size = 0
+    error = None
+    try:
+        size = input_file_path.stat().st_size
+        if getattr(args, 'raw_input', False):
+            # The sub-command works on the raw XML, e.g. "index"
+            xml_stream = open_xml_file(str(input_file_path))
+            args.func(xml_stream, input_file_path, args)
+        else:
+            analyze_file(input_file_path, args)
+    except Exception:
+        error = traceback.format_exc()
+        utils.log("Error while analyzing {}:\n{}".format(
+            input_file_path, error))
+
+    return FileReport(
+        path=input_file_path,
+        size=size,
+        elapsed=time.monotonic() - start,
+        error=error,
+    )
+
+
+def throughput(size: int, elapsed: float) -> str:
+    """Return a human readable throughput, in MiB/s."""
+    if elapsed <= 0:
+        return 'n/a'
+    return '{:.2f} MiB/s'.format(size / elapsed / 2**20)
+
+
+def log_summary(reports, elapsed: float) -> None:
+    """Log the outcome and the throughput of every processed file."""
+    utils.log('Summary:')
+    for report in reports:
+        if report.error is None:
+            outcome = 'ok'
+        else:
+            outcome = 'FAILED'
+        utils.log('  {outcome:6} {path} ({elapsed:.1f}s, {throughput})'.format(
+            outcome=outcome,
+            path=report.path,
+            elapsed=report.elapsed,
+            throughput=throughput(report.size, report.elapsed),
+        ))
+    total_size = sum(report.size for report in reports)
+    failed = sum(1 for report in reports if report.error is not None)
+    utils.log('Total: {files} files, {failed} failed ({elapsed:.1f}s, '
+              '{throughput})'.format(
+                  files=len(reports),
+                  failed=failed,
+                  elapsed=elapsed,
+                  throughput=throughput(total_size, elapsed),
+              ))
+    print(file=sys.stderr)
+
+
+def main():
+    """Main function."""
+    args = get_args()
+
+    if not args.output_dir_path.exists():
+        args.output_dir_path.mkdir(parents=True)
+
+    start = time.monotonic()
+    if args.jobs > 1 and not args.chunk_size:
+        with concurrent.futures.ProcessPoolExecutor(args.jobs) as executor:
+            futures = [
+                executor.submit(process_file, input_file_path, args)
+                for input_file_path in args.files
+            ]
+            reports = [future.result() for future in futures]
+    else:
+        reports = [
+            process_file(input_file_path, args)
+            for input_file_path in args.files
+        ]
+
+    log_summary(reports, time.monotonic() - start)
+
+    if any(report.error is not None for report in reports):
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,167 @@
+"""Periodic checkpoints of a run, to resume it after a crash.
+
+A checkpoint is saved between two pages: it records the id of the last page
+written, the size of the features output at that point, a snapshot of the
+stats and the updates to the manifest, if any. On resume, the pages up to
+the last one written are skipped on the raw XML, the features output is
+truncated to its size at the checkpoint and the processor appends to it
+what is left.
+
+The gzip outputs are written as a sequence of gzip members, a new one is
+started at each checkpoint, so that they can be truncated there. Any gzip
+reader decompresses them as a single stream.
+"""
+import collections
+import gzip
+import io
+import os
+import pathlib
+import pickle
+import time
+
+from typing import Iterator, Mapping, Optional
+
+from . import manifest, utils
+
+Checkpoint = collections.namedtuple('Checkpoint', [
+    'page_id',
+    'features_offset',
+    'stats',
+    'manifest',
+])
+
+
+def checkpoint_path(output_dir: pathlib.Path, basename: str) \
+        -> pathlib.Path:
+    """Return the path of the checkpoint of a dump."""
+    return output_dir/(basename + '.checkpoint')
+
+
+def load(path: pathlib.Path) -> Optional[Checkpoint]:
+    """Return the checkpoint saved at path, if any."""
+    if not path.exists():
+        return None
+    with open(str(path), 'rb') as f:
+        return pickle.load(f)
+
+
+def save(path: pathlib.Path, checkpoint: Checkpoint) -> None:
+    """Save a checkpoint, atomically replacing the previous one."""
+    temporary_path = str(path) + '.tmp'
+    with open(temporary_path, 'wb') as f:
+        pickle.dump(checkpoint, f, pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_path, str(path))
+
+
+class ResumableWriter:
+    """Text output which can be truncated at a checkpoint and appended to.
+
+    When resumed, everything is discarded until start() is called, so that
+    the beginning of the output (e.g. the XML header) is not repeated.
+    """
+
+    def __init__(self,
+                 path: str,
+                 compression: Optional[str]=None,
+                 offset: Optional[int]=None):
+        """Open the output at path, truncated at offset if given."""
+        if compression == 'gzip':
+            path += '.gz'
+        self.compression = compression
+        if offset is None:
+            self._file = open(path, 'wb')
+        else:
+            self._file = open(path, 'r+b')
+            self._file.truncate(offset)
+            self._file.seek(offset)
+        self.discarding = offset is not None
+        self._text = self._open_text()
+
+    def _open_text(self) -> io.TextIOWrapper:
+        if self.compression == 'gzip':
+            binary = gzip.GzipFile(fileobj=self._file, mode='wb')
+        else:
+            binary = self._file
+        return io.TextIOWrapper(binary, encoding='utf-8')
+
+    def start(self) -> None:
+        """Stop discarding the data written."""
+        self.discarding = False
+
+    def write(self, text: str) -> int:
+        if self.discarding:
+            return len(text)
+        return self._text.write(text)
+
+    def flush(self) -> None:
+        self._text.flush()
+
+    def checkpoint(self) -> int:
+        """Write all the data to disk, return the size of the output."""
+        self._text.flush()
+        binary = self._text.detach()
+        if self.compression == 'gzip':
+            # Terminate the gzip member, another one follows
+            binary.close()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        offset = self._file.tell()
+        self._text = self._open_text()
+        return offset
+
+    def close(self) -> None:
+        self._text.close()
+        self._file.close()
+
+    def __enter__(self) -> 'ResumableWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class CheckpointedDump:
+    """Wrap a dump, saving a checkpoint every interval seconds.
+
+    A page is completely written, and its stats are collected, once the
+    processor asks for the next one: the checkpoints are saved then.
+    """
+
+    def __init__(self,
+                 dump,
+                 features_output: ResumableWriter,
+                 stats: Optional[Mapping],
+                 path: pathlib.Path,
+                 interval: float,
+                 page_manifest: Optional[manifest.Manifest]=None):
+        """Instantiate a dump which saves checkpoints at path."""
+        self._dump = dump
+        self.site_info = dump.site_info
+        self.features_output = features_output
+        self.stats = stats
+        self.path = path
+        self.interval = interval
+        self.page_manifest = page_manifest
+
+    def __iter__(self) -> Iterator:
+        # All that comes before the first page has been written already
+        self.features_output.start()
+        last_checkpoint = time.monotonic()
+        for page in self._dump:
+            yield page
+            if time.monotonic() - last_checkpoint >= self.interval:
+                self.save(page.id)
+                last_checkpoint = time.monotonic()
+
+    def save(self, page_id: int) -> None:
+        """Save a checkpoint after the page with the given id."""
+        utils.log('Saving checkpoint after page', page_id)
+        save(self.path, Checkpoint(
+            page_id=page_id,
+            features_offset=self.features_output.checkpoint(),
+            stats=self.stats,
+            manifest=(None if self.page_manifest is None
+                      else self.page_manifest.updates),
+        ))
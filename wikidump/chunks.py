@@ -0,0 +1,202 @@
+"""Process a single dump in page-aligned chunks, on many cores.
+
+The decompressed stream is cut, page by page, in standalone dumps which are
+analyzed by the selected processor in worker processes. The features of the
+chunks are then stitched back together in page order, so that the output is
+the same as the one of a serial run.
+"""
+import collections
+import concurrent.futures
+import io
+import os
+import tempfile
+
+from typing import IO, Iterator, Mapping, Optional
+
+from . import page_scanner, readers, utils
+
+BLOCK_SIZE = 2**20  # characters copied at once while stitching
+
+
+def write_chunks(
+        header: bytes,
+        segments: Iterator[page_scanner.Segment],
+        chunk_size: int,
+        directory: str) -> Iterator[str]:
+    """Write the pages in standalone dumps of about chunk_size bytes.
+
+    Return the paths of the dumps written, in page order.
+    """
+    chunk = None
+    count = 0
+    for segment in segments:
+        if segment.kind == page_scanner.FOOTER:
+            break
+
+        if chunk is None:
+            path = os.path.join(directory, 'chunk-{}.xml'.format(count))
+            count += 1
+            chunk = open(path, 'wb')
+            chunk.write(header)
+
+        chunk.write(segment.data)
+
+        if segment.kind == page_scanner.PAGE_TAIL \
+                and chunk.tell() >= chunk_size:
+            chunk.write(page_scanner.DUMP_END)
+            chunk.close()
+            chunk = None
+            yield path
+
+    if chunk is not None:
+        chunk.write(page_scanner.DUMP_END)
+        chunk.close()
+        yield path
+
+
+def process_chunk(chunk_path: str, features_path: str, args) \
+        -> Optional[Mapping]:
+    """Run the selected processor on a chunk, return the collected stats."""
+    with open(chunk_path, 'rb') as chunk, \
+            open(features_path, 'wt', encoding='utf-8', newline='') \
+            as features_output, \
+            open(os.devnull, 'wt') as stats_output:
+        dump = readers.open_dump(chunk, args.reader)
+        stats = args.func(dump, features_output, stats_output, args)
+    os.remove(chunk_path)
+    return stats
+
+
+def _common_prefix_length(first: str, second: str) -> int:
+    length = 0
+    for a, b in zip(first, second):
+        if a != b:
+            break
+        length += 1
+    return length
+
+
+class Stitcher:
+    """Concatenate the features of the chunks, dropping the repeated parts.
+
+    The output of a processor is made of a prefix, the output of every page
+    and a suffix. The output of an empty dump is the prefix followed by the
+    suffix: it tells what has to be removed from the output of each chunk.
+    """
+
+    def __init__(self, empty_output: str, output_h: IO[str]):
+        """Instantiate a stitcher that writes to output_h."""
+        self.empty_output = empty_output
+        self.output_h = output_h
+        self.split = None
+
+    def add(self, features_path: str) -> None:
+        """Append the features of the next chunk to the output."""
+        with open(features_path, 'rt', encoding='utf-8', newline='') \
+                as features:
+            head = features.read(len(self.empty_output) + 1)
+            # Skip the chunks whose pages didn't produce any output
+            if head != self.empty_output:
+                self._copy(head, features)
+        os.remove(features_path)
+
+    def _copy(self, head: str, features: IO[str]) -> None:
+        """Copy the features of a chunk, without its prefix and suffix."""
+        if self.split is None:
+            self.split = _common_prefix_length(self.empty_output, head)
+            self.output_h.write(self.empty_output[:self.split])
+
+        prefix = self.empty_output[:self.split]
+        suffix = self.empty_output[self.split:]
+        if not head.startswith(prefix):
+            raise ValueError('Unexpected output of chunk {}'.format(
+                features.name))
+
+        data = head[len(prefix):]
+        while True:
+            cut = len(data) - len(suffix)
+            if cut > 0:
+                self.output_h.write(data[:cut])
+                data = data[cut:]
+            block = features.read(BLOCK_SIZE)
+            if not block:
+                break
+            data += block
+
+        if data != suffix:
+            raise ValueError('Unexpected output of chunk {}'.format(
+                features.name))
+
+    def close(self) -> None:
+        """Write the end of the output."""
+        if self.split is None:
+            self.output_h.write(self.empty_output)
+        else:
+            self.output_h.write(self.empty_output[self.split:])
+
+
+def run(xml_stream: IO[bytes],
+        features_output_h: IO[str],
+        stats_output_h: IO[str],
+        args) -> None:
+    """Process a dump in chunks of args.chunk_size MiB, using args.jobs
+    worker processes.
+    """
+    segments = page_scanner.scan(xml_stream)
+    header = next(segments).data
+    empty_dump = header + page_scanner.DUMP_END
+
+    with tempfile.TemporaryDirectory(
+            prefix='.chunks-', dir=str(args.output_dir_path)) as directory:
+        empty_dump_path = os.path.join(directory, 'empty.xml')
+        with open(empty_dump_path, 'wb') as f:
+            f.write(empty_dump)
+        process_chunk(empty_dump_path, empty_dump_path + '.features', args)
+        with open(empty_dump_path + '.features', encoding='utf-8',
+                  newline='') as f:
+            stitcher = Stitcher(f.read(), features_output_h)
+
+        stats = None
+        pending = collections.deque()
+
+        def stitch_oldest():
+            nonlocal stats
+            future, features_path = pending.popleft()
+            chunk_stats = future.result()
+            if stats is None:
+                stats = chunk_stats
+            elif chunk_stats is not None:
+                utils.merge_stats(stats, chunk_stats)
+            stitcher.add(features_path)
+
+        chunk_paths = write_chunks(
+            header,
+            segments,
+            chunk_size=int(args.chunk_size * 2**20),
+            directory=directory,
+        )
+        with concurrent.futures.ProcessPoolExecutor(args.jobs) as executor:
+            for chunk_path in chunk_paths:
+                utils.log('Processing chunk', chunk_path)
+                features_path = chunk_path + '.features'
+                future = executor.submit(
+                    process_chunk, chunk_path, features_path, args)
+                pending.append((future, features_path))
+                # Bound the disk space used by the chunks waiting
+                if len(pending) >= 2 * args.jobs:
+                    stitch_oldest()
+            while pending:
+                stitch_oldest()
+
+        with features_output_h:
+            stitcher.close()
+
+    # Render the merged stats running the processor on the empty dump, their
+    # start and end times are kept
+    with open(os.devnull, 'wt') as devnull:
+        dump = readers.open_dump(io.BytesIO(empty_dump), args.reader)
+        if stats is None:
+            args.func(dump, devnull, stats_output_h, args)
+        else:
+            args.func(dump, devnull, stats_output_h, args, stats=stats)
+    stats_output_h.close()
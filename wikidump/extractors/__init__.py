@@ -1,2 +1,2 @@
-from . import arxiv, doi, isbn, pubmed, misc
+from . import arxiv, combined, delta, doi, isbn, lexer, pubmed, misc
 from .misc import *
@@ -4,7 +4,7 @@ Regular expressions taken from `python-mwcites` by Aaron Halfaker.
 See https://github.com/mediawiki-utilities/python-mwcites
 """
 import regex as re
-from typing import Iterator
+from typing import Iterator, Tuple
 
 from .common import CaptureResult, Identifier, Span
 
@@ -27,17 +27,20 @@ ARXIV_REs = [all_re.format(prefix=prefix,
 ARXIV_REs = [re.compile(el, re.I | re.U) for el in ARXIV_REs]
 
 
+def read(match) -> Tuple[str, int, int]:
+    """Return the id matched by one of ARXIV_REs, its begin and its end."""
+    group = 'new_id' if match.group('new_id') else 'old_id'
+    return (match.group(group).lower(),) + match.span(group)
+
+
+def capture(match) -> CaptureResult[Identifier]:
+    """Return the identifier matched by one of ARXIV_REs."""
+    id_, begin, end = read(match)
+    return CaptureResult(Identifier("arxiv", id=id_), Span(begin, end))
+
+
 def extract(text: str) -> Iterator[CaptureResult[Identifier]]:
     """Extract arxiv identifiers."""
     for pattern in ARXIV_REs:
         for match in pattern.finditer(text):
-            if match.group('new_id'):
-                id_ = match.group('new_id')
-                span = match.span('new_id')
-            else:
-                id_ = match.group('old_id')
-                span = match.span('old_id')
-
-            yield CaptureResult(
-                Identifier("arxiv", id=id_.lower()), Span(*span)
-            )
+            yield capture(match)
@@ -0,0 +1,95 @@
+"""Extraction of the identifiers of many revisions at once, in columns.
+
+The identifiers of a batch of revisions are returned as NumPy arrays, one
+for each column, with a row for each identifier found. The values of the
+identifiers are stored once in value_table, for the whole batch, and the
+rows refer to them by index: the statistics can then be computed with
+vectorized group-bys (e.g. numpy.bincount) instead of per-identifier Python
+code.
+
+The module needs NumPy: it is not imported by wikidump.extractors, so that
+the processors do not load NumPy, and it is imported as
+wikidump.extractors.batch.
+"""
+import array
+
+import numpy
+from typing import List, Mapping, NamedTuple, Optional, Sequence
+
+from . import combined, misc
+from .common import SymbolTable
+
+__all__ = ('IdentifierColumns', 'extract_batch', 'type_counts')
+
+IdentifierColumns = NamedTuple('IdentifierColumns', [
+    ('page_ids', numpy.ndarray),
+    ('revision_ids', numpy.ndarray),
+    ('types', numpy.ndarray),
+    ('begins', numpy.ndarray),
+    ('ends', numpy.ndarray),
+    ('values', numpy.ndarray),
+    ('type_table', Sequence[str]),
+    ('value_table', List[str]),
+])
+
+
+def _column(buffer: array.array) -> numpy.ndarray:
+    """Return an array sharing the memory of buffer."""
+    return numpy.frombuffer(buffer, dtype=buffer.typecode)
+
+
+def extract_batch(texts: Sequence[str],
+                  page_ids: Optional[Sequence[int]]=None,
+                  revision_ids: Optional[Sequence[int]]=None) \
+        -> IdentifierColumns:
+    """Extract the identifiers of the texts, in columns.
+
+    The ids of the page and of the revision of each text can be given, the
+    rows are labelled with them. Otherwise both columns hold the index of
+    the text in texts.
+    """
+    if page_ids is None:
+        page_ids = range(len(texts))
+    if revision_ids is None:
+        revision_ids = range(len(texts))
+
+    page_column = array.array('l')
+    revision_column = array.array('l')
+    types = array.array('B')
+    begins = array.array('l')
+    ends = array.array('l')
+    values = array.array('l')
+    # The ids of the values are the same for all the texts
+    symbols = SymbolTable()
+
+    for text, page_id, revision_id in zip(texts, page_ids, revision_ids):
+        captures = misc.pub_identifier_arrays(text, symbols=symbols)
+        if not captures:
+            continue
+
+        page_column.extend([page_id] * len(captures))
+        revision_column.extend([revision_id] * len(captures))
+        types.extend(captures.types)
+        begins.extend(captures.begins)
+        ends.extend(captures.ends)
+        values.extend(captures.values)
+
+    return IdentifierColumns(
+        page_ids=_column(page_column),
+        revision_ids=_column(revision_column),
+        types=_column(types),
+        begins=_column(begins),
+        ends=_column(ends),
+        values=_column(values),
+        type_table=combined.TYPES,
+        value_table=symbols.values,
+    )
+
+
+def type_counts(columns: IdentifierColumns) -> Mapping[str, int]:
+    """Return how many identifiers of each type are in the columns."""
+    counts = numpy.bincount(columns.types, minlength=len(columns.type_table))
+    return {
+        type_name: int(count)
+        for type_name, count in zip(columns.type_table, counts)
+    }
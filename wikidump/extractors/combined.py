@@ -0,0 +1,124 @@
+"""Extractor for all the publication identifiers at once.
+
+Running the extractors of the single identifiers one after the other means
+nine regular expression searches over the whole text. Every one of those
+patterns starts with a literal (e.g. "arxiv", "isbn", "10."), so the text
+is lowercased once (see common.fold_case) and the seven literals are
+located with str.find, which is far faster than any regular expression
+search. The patterns are then only matched, anchored, where their literal
+is.
+
+Each pattern keeps track of the end of its last match, like finditer does,
+so the identifiers found, their spans and their order are the same as
+running the extractors one after the other.
+
+The identifiers are read straight into the arrays of a common.Captures,
+extract iterates over them.
+"""
+from typing import Iterator, List, Optional
+
+from . import arxiv, doi, isbn, pubmed
+from .common import (
+    CaptureResult, Captures, Identifier, SymbolTable, fold_case)
+
+__all__ = ('extract', 'extract_arrays')
+
+# The types of the identifiers, see common.Captures.
+TYPES = ('arxiv', 'doi', 'isbn', 'pmid', 'pmc')
+
+# The patterns, in the order of the results.
+PATTERNS = (
+    arxiv.ARXIV_REs[0],
+    arxiv.ARXIV_REs[1],
+    arxiv.ARXIV_REs[2],
+    doi.DOI_START_RE,
+    isbn.ISBN_RE,
+    pubmed.PMID_TEMPLATE_RE,
+    pubmed.PMID_URL_RE,
+    pubmed.PMC_TEMPLATE_RE,
+    pubmed.PMC_URL_RE,
+)
+
+# The literal each pattern starts with (lowercase), and the patterns starting
+# with it.
+TRIGGERS = {
+    'arxiv': (0, 2),
+    '//arxiv.org/': (1,),
+    '10.': (3,),
+    'isbn': (4,),
+    'pmid': (5,),
+    '//www.ncbi.nlm.nih.gov/': (6, 8),
+    'pmc': (7,),
+}
+
+# The index in TYPES of the identifiers matched by each pattern, and the
+# function that reads them.
+_READS = (
+    (0, arxiv.read),
+    (0, arxiv.read),
+    (0, arxiv.read),
+    (1, None),  # The dois are read by doi.doi_spans
+    (2, isbn.read),
+    (3, pubmed.read),
+    (3, pubmed.read),
+    (4, pubmed.read),
+    (4, pubmed.read),
+)
+_DOI = 3
+
+
+def matches(text: str, lowercase_text: Optional[str]=None) -> List[list]:
+    """Return the matches of each one of PATTERNS in text.
+
+    The matches are the same that PATTERNS[i].finditer(text) would find.
+    The text folded by fold_case can be given, if already at hand.
+    """
+    if lowercase_text is None:
+        lowercase_text = fold_case(text)
+    found = [[] for _ in PATTERNS]
+    for literal, patterns in TRIGGERS.items():
+        first_position = lowercase_text.find(literal)
+        if first_position == -1:
+            continue
+        for i in patterns:
+            pattern = PATTERNS[i]
+            pattern_matches = found[i]
+            last_end = 0
+            position = first_position
+            while position != -1:
+                if position >= last_end:
+                    match = pattern.match(text, position)
+                    if match is not None:
+                        pattern_matches.append(match)
+                        last_end = match.end()
+                position = lowercase_text.find(literal, position + 1)
+    return found
+
+
+def extract_arrays(text: str,
+                   symbols: Optional[SymbolTable]=None,
+                   lowercase_text: Optional[str]=None) -> Captures:
+    """Extract all the publication identifiers, in arrays.
+
+    The values are added to symbols, if given. See matches for
+    lowercase_text.
+    """
+    captures = Captures(TYPES, symbols)
+    append = captures.append
+    for i, pattern_matches in enumerate(matches(text, lowercase_text)):
+        if not pattern_matches:
+            continue
+        type_index, read = _READS[i]
+        if i == _DOI:
+            for begin, end in doi.doi_spans(text, pattern_matches):
+                append(type_index, text[begin:end], begin, end)
+        else:
+            for match in pattern_matches:
+                append(type_index, *read(match))
+    return captures
+
+
+def extract(text: str, lowercase_text: Optional[str]=None) \
+        -> Iterator[CaptureResult[Identifier]]:
+    """Extract all the publication identifiers."""
+    return iter(extract_arrays(text, lowercase_text=lowercase_text))
@@ -1,5 +1,12 @@
 """Classes for the extractors."""
-from typing import Generic, NamedTuple, T
+import array
+import bisect
+import collections
+import operator
+
+from typing import (
+    Generic, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence,
+    Set, T)
 
 Identifier = NamedTuple("Identifier", [
     ('type', str),
@@ -24,3 +31,197 @@ class Span(NamedTuple('Span', [('begin', int), ('end', int)])):
 
     def __lt__(self, other: 'Span') -> bool:
         return self[0] > other[0] and self[1] < other[1]
+
+
+class SymbolTable:
+    """Interning of values, each distinct value gets a small integer id.
+
+    A value is kept once, in values, at the index of its id: the diffs and
+    the counters can work on the ids instead of the values. The table is
+    meant to be shared for a while (e.g. the revisions of a page) and then
+    cleared.
+    """
+
+    __slots__ = ('values', '_ids')
+
+    def __init__(self):
+        """Instantiate an empty table."""
+        self.values = []
+        self._ids = {}
+
+    def id(self, value) -> int:
+        """Return the id of the value, adding it to the table if needed."""
+        symbol_id = self._ids.get(value)
+        if symbol_id is None:
+            symbol_id = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return symbol_id
+
+    def value(self, symbol_id: int):
+        """Return the value with the given id."""
+        return self.values[symbol_id]
+
+    def clear(self) -> None:
+        """Forget all the values, their ids are not valid anymore."""
+        self.values = []
+        self._ids = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, value) -> bool:
+        return value in self._ids
+
+
+class Captures:
+    """The identifiers captured in a text, as parallel arrays.
+
+    The i-th capture is of type type_table[types[i]], its value has id
+    values[i] in symbols and it spans from begins[i] to ends[i]. The symbol
+    table can be shared by the captures of many texts. Iterating over the
+    captures yields them as CaptureResult objects, built on the fly.
+    """
+
+    __slots__ = (
+        'type_table',
+        'symbols',
+        'types',
+        'values',
+        'begins',
+        'ends',
+    )
+
+    def __init__(self,
+                 type_table: Sequence[str],
+                 symbols: Optional[SymbolTable]=None):
+        """Instantiate the captures, of the types in type_table."""
+        self.type_table = type_table
+        self.symbols = SymbolTable() if symbols is None else symbols
+        self.types = array.array('B')
+        self.values = array.array('l')
+        self.begins = array.array('l')
+        self.ends = array.array('l')
+
+    @property
+    def value_table(self) -> List[str]:
+        return self.symbols.values
+
+    def append(self, type_index: int, value: str, begin: int, end: int) \
+            -> None:
+        """Add a capture, of type type_table[type_index]."""
+        self.types.append(type_index)
+        self.values.append(self.symbols.id(value))
+        self.begins.append(begin)
+        self.ends.append(end)
+
+    def extend(self,
+               type_index: int,
+               values: Sequence[int],
+               begins: Sequence[int],
+               ends: Sequence[int]) -> None:
+        """Add captures of type type_table[type_index], their values are
+        already ids in symbols.
+        """
+        self.types.extend(array.array('B', [type_index]) * len(values))
+        self.values.extend(values)
+        self.begins.extend(begins)
+        self.ends.extend(ends)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __iter__(self) -> Iterator[CaptureResult[Identifier]]:
+        return map(CaptureResult, self.identifiers(), self.spans())
+
+    def identifiers(self) -> Iterator[Identifier]:
+        """Return the identifiers captured, in order."""
+        type_table = self.type_table
+        value_table = self.value_table
+        return (
+            Identifier(type_table[type_index], value_table[value_index])
+            for type_index, value_index in zip(self.types, self.values)
+        )
+
+    def spans(self) -> Iterator[Span]:
+        """Return the spans of the captures, in order."""
+        return map(Span, self.begins, self.ends)
+
+    def distinct_identifiers(self) -> Set[Identifier]:
+        """Return the identifiers captured, without repetitions."""
+        type_table = self.type_table
+        value_table = self.value_table
+        return {
+            Identifier(type_table[type_index], value_table[value_index])
+            for type_index, value_index in set(zip(self.types, self.values))
+        }
+
+    def type_counts(self) -> Mapping[str, int]:
+        """Return how many identifiers of each type were captured."""
+        return collections.Counter({
+            self.type_table[type_index]: count
+            for type_index, count in collections.Counter(self.types).items()
+        })
+
+
+class SpanIndex:
+    """Sorted spans, to find out whether they contain other spans.
+
+    The spans are sorted by begin, along with the maximum end of the spans
+    up to each one: a span is contained in one of them if and only if that
+    maximum, among the spans beginning before it, reaches its end.
+    """
+
+    def __init__(self, spans: Iterable[Span]):
+        """Build the index of the spans."""
+        # Not sorted(spans): Span.__lt__ is the strict containment
+        spans = sorted(spans, key=operator.itemgetter(0))
+        self.begins = [begin for begin, _ in spans]
+        self.max_ends = []
+        max_end = -1
+        for _, end in spans:
+            max_end = max(max_end, end)
+            self.max_ends.append(max_end)
+
+    def __len__(self) -> int:
+        return len(self.begins)
+
+    def contains(self, span: Span) -> bool:
+        """Return True if any of the spans contains span, or is equal to it.
+        """
+        i = bisect.bisect_right(self.begins, span[0]) - 1
+        return i >= 0 and self.max_ends[i] >= span[1]
+
+    def contains_all(self, spans: Sequence[Span]) -> List[bool]:
+        """Return, for each one of spans, whether any of the spans contains it.
+
+        The spans are sorted and swept along with the index, in a single
+        pass over both.
+        """
+        found = [False] * len(spans)
+        begins = self.begins
+        max_ends = self.max_ends
+        size = len(begins)
+        i = 0
+        max_end = -1
+        order = sorted(range(len(spans)), key=lambda i: spans[i][0])
+        for position in order:
+            begin, end = spans[position]
+            while i < size and begins[i] <= begin:
+                max_end = max_ends[i]
+                i += 1
+            found[position] = max_end >= end
+        return found
+
+
+def fold_case(text: str) -> str:
+    """Return the text in lowercase, keeping the positions of the characters.
+
+    A literal matched ignoring the case in the text is found as it is, in
+    lowercase, in the folded text.
+    """
+    # Matched as "i" and "s" ignoring the case, but lowercased differently
+    if '\u0130' in text:
+        text = text.replace('\u0130', 'i')
+    if '\u017f' in text:
+        text = text.replace('\u017f', 's')
+    return text.lower()
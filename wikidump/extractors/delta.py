@@ -0,0 +1,268 @@
+"""Extract the identifiers of a revision from the ones of the previous one.
+
+Consecutive revisions of a page usually differ by a few bytes: the text
+before the common prefix and after the common suffix of the two is not
+scanned again.
+
+The matches of every pattern of combined.PATTERNS are kept, with how far
+each one reaches (where the pattern, and doi.doi_end for the dois, stopped
+reading). The patterns are then matched again:
+
+* from the start of a line before the change (see safe_start): no pattern
+  reads across the newline before it, so the matches before it are the
+  same and do not affect the ones after it;
+* until, past the change, a position that neither the new matches nor
+  the previous ones (shifted by the difference of length) reach: from
+  there on, the patterns read the same text from the same state, so the
+  previous matches are taken as they are, shifted.
+
+The result is the same as combined.extract_arrays on the whole text.
+"""
+import array
+import bisect
+
+import regex
+from typing import Optional, Sequence
+
+from . import combined, doi
+from .common import Captures, SymbolTable, fold_case
+
+__all__ = ('Extraction', 'extract')
+
+# The lines ending with one of these characters can be continued by a
+# pattern on the next one (e.g. "pmid =\n123", "arxiv:\n1234.5678",
+# "isbn\n123", "</\nref>").
+_UNSAFE_LINE_END_RE = regex.compile(r'[\s\w=:/]')
+
+# The literal each pattern starts with.
+_LITERALS = [None] * len(combined.PATTERNS)
+for _literal, _patterns in combined.TRIGGERS.items():
+    for _i in _patterns:
+        _LITERALS[_i] = _literal
+
+# The value of the dois skipped, see doi.doi_spans.
+_SKIPPED = -1
+
+
+class Records:
+    """The matches of a pattern, as parallel arrays.
+
+    The i-th match starts at starts[i] and the pattern read the text up to
+    reaches[i]; the identifier read has id values[i] in the symbol table of
+    the extraction and spans from begins[i] to ends[i].
+    """
+
+    __slots__ = ('starts', 'reaches', 'values', 'begins', 'ends')
+
+    def __init__(self):
+        """Instantiate the records, without any match."""
+        self.starts = array.array('l')
+        self.reaches = array.array('l')
+        self.values = array.array('l')
+        self.begins = array.array('l')
+        self.ends = array.array('l')
+
+    def append(self,
+               start: int,
+               reach: int,
+               value: int,
+               begin: int,
+               end: int) -> None:
+        self.starts.append(start)
+        self.reaches.append(reach)
+        self.values.append(value)
+        self.begins.append(begin)
+        self.ends.append(end)
+
+    def head(self, size: int) -> 'Records':
+        """Return the first size records."""
+        head = Records()
+        for name in Records.__slots__:
+            setattr(head, name, getattr(self, name)[:size])
+        return head
+
+    def extend_shifted(self, other: 'Records', index: int, delta: int) \
+            -> None:
+        """Add the records of other from index on, moved by delta."""
+        self.values.extend(other.values[index:])
+        for name in ('starts', 'reaches', 'begins', 'ends'):
+            getattr(self, name).extend(array.array(
+                'l', [position + delta
+                      for position in getattr(other, name)[index:]]))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+class Extraction:
+    """The identifiers found in a text, and the matches they come from.
+
+    The values of the identifiers are kept in a symbol table, shared with
+    the extractions made from this one.
+    """
+
+    __slots__ = ('text', 'symbols', 'records')
+
+    def __init__(self,
+                 text: str,
+                 symbols: Optional[SymbolTable]=None,
+                 records: Optional[Sequence[Records]]=None):
+        """Instantiate the extraction, with the records of each pattern."""
+        self.text = text
+        self.symbols = SymbolTable() if symbols is None else symbols
+        if records is None:
+            records = tuple(Records() for _ in combined.PATTERNS)
+        self.records = records
+
+    def captures(self) -> Captures:
+        """Return the identifiers, as combined.extract_arrays does.
+
+        The values are ids in the symbol table of the extraction.
+        """
+        captures = Captures(combined.TYPES, self.symbols)
+        for (type_index, _), records in zip(combined._READS, self.records):
+            values, begins, ends = records.values, records.begins, records.ends
+            if _SKIPPED in values:
+                kept = [i for i, value in enumerate(values)
+                        if value != _SKIPPED]
+                values = [values[i] for i in kept]
+                begins = [begins[i] for i in kept]
+                ends = [ends[i] for i in kept]
+            captures.extend(type_index, values, begins, ends)
+        return captures
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    """Return the length of the common prefix of a and b."""
+    low, high = 0, min(len(a), len(b))
+    # The slices are compared by C code, halving the difference each time
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def common_suffix_length(a: str, b: str, prefix_length: int=0) -> int:
+    """Return the length of the common suffix of a and b, not overlapping
+    their common prefix.
+    """
+    low, high = 0, min(len(a), len(b)) - prefix_length
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:len(a) - low] == b[len(b) - middle:len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def safe_start(text: str, position: int) -> int:
+    """Return the start of a line, at or before position, that no pattern
+    match reads across.
+    """
+    newline = text.rfind('\n', 0, position)
+    while newline > 0 and _UNSAFE_LINE_END_RE.match(text, newline - 1):
+        newline = text.rfind('\n', 0, newline)
+    return newline + 1
+
+
+def _scan(i: int,
+          text: str,
+          lowercase_text: str,
+          start: int,
+          records: Records,
+          symbols: SymbolTable,
+          previous_records: Optional[Records]=None,
+          previous_index: int=0,
+          delta: int=0,
+          changed_end: int=0) -> None:
+    """Add to records the matches of combined.PATTERNS[i] from start on.
+
+    With previous_records, after changed_end the rest of the matches are
+    taken from them, from previous_index on, as soon as possible.
+    """
+    pattern = combined.PATTERNS[i]
+    literal = _LITERALS[i]
+    type_index, read = combined._READS[i]
+    is_doi = i == combined._DOI
+    symbol_id = symbols.id
+    append = records.append
+
+    last_end = 0
+    doi_last_end = 0
+    reach = -1
+    previous_reach = -1
+    position = lowercase_text.find(literal, start)
+    while position != -1:
+        if previous_records is not None and position > changed_end:
+            previous_position = position - delta
+            previous_starts = previous_records.starts
+            while previous_index < len(previous_starts) \
+                    and previous_starts[previous_index] < previous_position:
+                previous_reach = max(
+                    previous_reach, previous_records.reaches[previous_index])
+                previous_index += 1
+            if reach < position and previous_reach < previous_position:
+                records.extend_shifted(previous_records, previous_index, delta)
+                return
+
+        if position >= last_end:
+            match = pattern.match(text, position)
+            if match is not None:
+                last_end = match.end()
+                if not is_doi:
+                    value, begin, end = read(match)
+                    append(position, last_end, symbol_id(value), begin, end)
+                    reach = max(reach, last_end)
+                elif position > doi_last_end:
+                    end = doi.doi_span_end(text, last_end)
+                    doi_last_end = end
+                    append(position, max(last_end, end),
+                           symbol_id(text[position:end]), position, end)
+                    reach = max(reach, last_end, end)
+                else:
+                    doi_last_end = max(last_end, doi_last_end)
+                    append(position, doi_last_end, _SKIPPED, 0, 0)
+                    reach = max(reach, doi_last_end)
+        position = lowercase_text.find(literal, position + 1)
+
+
+def extract(text: str,
+            previous: Optional[Extraction]=None,
+            lowercase_text: Optional[str]=None) -> Extraction:
+    """Extract all the publication identifiers.
+
+    With the extraction of the previous revision, only the text around the
+    change is scanned. The text folded by common.fold_case can be given, if
+    already at hand.
+    """
+    if lowercase_text is None:
+        lowercase_text = fold_case(text)
+    if previous is None:
+        extraction = Extraction(text)
+        for i, records in enumerate(extraction.records):
+            _scan(i, text, lowercase_text, 0, records, extraction.symbols)
+        return extraction
+
+    previous_text = previous.text
+    prefix_length = common_prefix_length(previous_text, text)
+    if prefix_length == len(previous_text) == len(text):
+        return Extraction(text, previous.symbols, previous.records)
+    suffix_length = common_suffix_length(previous_text, text, prefix_length)
+
+    start = safe_start(text, prefix_length)
+    changed_end = len(text) - suffix_length
+    delta = len(text) - len(previous_text)
+
+    all_records = []
+    for i, previous_records in enumerate(previous.records):
+        # The matches before start reach before it
+        kept = bisect.bisect_left(previous_records.starts, start)
+        records = previous_records.head(kept)
+        _scan(i, text, lowercase_text, start, records, previous.symbols,
+              previous_records, kept, delta, changed_end)
+        all_records.append(records)
+    return Extraction(text, previous.symbols, tuple(all_records))
@@ -8,7 +8,7 @@ from collections import defaultdict
 
 import regex as re
 from more_itertools import peekable
-from typing import Iterator
+from typing import Iterable, Iterator, Tuple
 
 from .common import CaptureResult, Identifier, Span
 
@@ -137,29 +137,86 @@ def read_doi(tokens):
     return Identifier('doi', _punctuation_at_end_re.sub('', id_))
 
 
-def tokenize_search(text, start):
-    match = _lexicon_re.search(text, start)
+# The characters where a doi may end, see doi_end.
+_STOP_RE = re.compile(r'[\s|?#\[\]{}<\-]')
+
+
+def doi_end(text: str, position: int) -> int:
+    """Return where the doi which continues at position ends.
+
+    The text is walked from one of _STOP_RE to the next: the doi ends at
+    whitespace, pipes, "?", "#", tags, comments and at the closing brackets
+    and curly braces not opened in it. This is what read_doi does on the
+    tokens, without tokenizing the text.
+    """
+    bracket_depth = 0
+    curly_depth = 0
+    match = _STOP_RE.search(text, position)
     while match is not None:
-        yield match.lastgroup, match.group(0)
-        match = _lexicon_re.search(text, match.end())
+        position = match.start()
+        char = text[position]
+        if char == '[':
+            bracket_depth += 1
+        elif char == ']':
+            if bracket_depth == 0:
+                return position
+            bracket_depth -= 1
+        elif char == '{':
+            curly_depth += 1
+        elif char == '}':
+            if curly_depth == 0:
+                return position
+            curly_depth -= 1
+        elif char == '<':
+            if text.startswith('<!--', position) \
+                    or TAGS_RE.match(text, position):
+                return position
+        elif char == '-':
+            if text.startswith('-->', position):
+                return position
+        else:
+            return position
+        match = _STOP_RE.search(text, position + 1)
+    return len(text)
 
 
 def extract_search(text: str) -> Iterator[CaptureResult[Identifier]]:
+    return read_dois(text, DOI_START_RE.finditer(text))
+
+
+def doi_span_end(text: str, position: int) -> int:
+    """Return where the doi which continues at position ends, without the
+    punctuation at its end.
+    """
+    end_pos = doi_end(text, position)
+    while text[end_pos - 1] in '.,!':
+        end_pos -= 1
+    return end_pos
+
+
+def doi_spans(text: str, starts: Iterable) -> Iterator[Tuple[int, int]]:
+    """Return the begin and the end of the dois at the matches of
+    DOI_START_RE in text.
+    """
     last_end = 0
-    for match in DOI_START_RE.finditer(text):
+    for match in starts:
         begin_pos = match.start()
 
         if begin_pos > last_end:
-            tokens = tokenize_search(text, begin_pos)
-            tokens = peekable(tokens)
+            end_pos = doi_span_end(text, match.end())
 
-            identifier = read_doi(tokens)
-            end_pos = begin_pos + len(identifier.id)
-
-            yield CaptureResult(identifier, Span(begin_pos, end_pos))
+            yield begin_pos, end_pos
 
             last_end = end_pos
         else:
             last_end = max(match.end(), last_end)
 
+
+def read_dois(text: str, starts: Iterable) \
+        -> Iterator[CaptureResult[Identifier]]:
+    """Read the dois at the matches of DOI_START_RE in text."""
+    for begin, end in doi_spans(text, starts):
+        yield CaptureResult(Identifier('doi', text[begin:end]),
+                            Span(begin, end))
+
 extract = extract_search  # Setting the default to the best method
@@ -4,7 +4,7 @@ Regular expression taken from `python-mwcites` by Aaron Halfaker.
 See https://github.com/mediawiki-utilities/python-mwcites
 """
 import regex as re
-from typing import Iterator
+from typing import Iterator, Tuple
 
 from .common import CaptureResult, Identifier, Span
 
@@ -13,10 +13,18 @@ __all__ = ('extract',)
 ISBN_RE = re.compile(r'isbn\s?=?\s?([0-9\-Xx]+)', re.I)
 
 
+def read(match) -> Tuple[str, int, int]:
+    """Return the id matched by ISBN_RE, its begin and its end."""
+    return (match.group(1).replace('-', ''),) + match.span(1)
+
+
+def capture(match) -> CaptureResult[Identifier]:
+    """Return the identifier matched by ISBN_RE."""
+    id_, begin, end = read(match)
+    return CaptureResult(Identifier('isbn', id=id_), Span(begin, end))
+
+
 def extract(text: str) -> Iterator[CaptureResult[Identifier]]:
     """Extract isbn identifiers."""
     for match in ISBN_RE.finditer(text):
-        id_ = match.group(1)
-        span = match.span(1)
-        yield CaptureResult(
-            Identifier('isbn', id=id_.replace('-', '')), Span(*span))
+        yield capture(match)
@@ -0,0 +1,126 @@
+"""Shared tables of the markup of the wikitext.
+
+The comments, the section headers, the <ref> tags, the templates (and
+their braces) and the wikilinks of a text are kept in a table of matches
+for each kind of markup. A Tokens object is built once for a text and
+given to the extractors called on it (e.g. sections and wikilinks for the
+links): they share its tables, and none of them is scanned twice. The
+table of the comments is also what utils.CommentMask removes from a text.
+
+This is not a single pass over the text. The markup can nest and overlap
+(wikilinks in templates, templates in references), so a merged scan has to
+try every kind of markup at every trigger from Python: both variants tried,
+str.find on the literals and one alternation pattern for the triggers, were
+10-30% slower on real wikitext than a finditer for each table. Every table
+is therefore the result of the finditer of its own pattern, a scan in C,
+and it is only scanned the first time it is needed.
+"""
+import regex
+from typing import List
+
+__all__ = ('Tokens',)
+
+COMMENT_RE = regex.compile(r'<!--(.*?)-->', regex.MULTILINE | regex.DOTALL)
+
+SECTION_HEADER_RE = regex.compile(
+    r'''^
+        (?P<equals>=+)              # Match the equals, greedy
+        (?P<section_name>           # <section_name>:
+            .+?                     # Text inside, non-greedy
+        )
+        (?P=equals)\s*              # Re-match the equals
+        $
+    ''', regex.VERBOSE | regex.MULTILINE)
+
+REFERENCE_RE = regex.compile(
+    r'''
+        <ref
+        .*?
+        <\/ref>
+    ''', regex.VERBOSE | regex.IGNORECASE | regex.DOTALL)
+
+TEMPLATE_RE = regex.compile(
+    r'''
+        \{\{
+        (?P<content>(?s).*?)
+        \}\}
+    ''', regex.VERBOSE)
+
+# The delimiters of the templates, see misc.balanced_templates.
+BRACES_RE = regex.compile(r'\{\{|\}\}')
+
+# See https://regex101.com/r/kF0yC9/12
+# The text inside the 'link' group is title of the page, it is limited to 256
+# chars since it is the max supported by MediaWiki for page titles [1].
+# Furthermore pipes and brakets (|,[,]) are invalid characters for page
+# titles [2]. Furthermore, newlines are not allowed [3].
+# The anchor text allows pipes and closed brakets, but not open ones [3],
+# newlines are allowed [3].
+# See:
+# [1] https://en.wikipedia.org/w/index.php?title=Wikipedia:Wikipedia_records\
+#    &oldid=709472636#Article_with_longest_title
+# [2] https://www.mediawiki.org/w/index.php?title=Manual:$wgLegalTitleChars\
+#    &oldid=1274292
+# [3] https://it.wikipedia.org/w/index.php?\
+#   title=Utente:CristianCantoro/Sandbox&oldid=79784393#Test_regexp
+
+WIKILINK_RE = regex.compile(
+    r'''\[\[                              # Match two opening brackets
+       (?P<link>                          # <link>:
+           [^\n\|\]\[\#\<\>\{\}]{0,256}   # Text inside link group
+                                          # everything not illegal, non-greedy
+                                          # can be empty or up to 256 chars
+       )
+       (?:                                # Non-capturing group
+          \|                              # Match a pipe
+          (?P<anchor>                     # <anchor>:
+              [^\[]*?                     # Test inside anchor group:
+                                          # match everything not an open braket
+                                          # - non greedy
+                                          # if empty the anchor text is link
+          )
+       )?                                 # anchor text is optional
+       \]\]                               # Match two closing brackets
+     ''', regex.VERBOSE | regex.MULTILINE)
+
+
+class Tokens:
+    """The tables of the markup of a text."""
+
+    __slots__ = ('text', '_tables')
+
+    def __init__(self, text: str):
+        """Instantiate the tables of the text, scanned when first needed."""
+        self.text = text
+        self._tables = {}
+
+    def _table(self, pattern) -> List:
+        table = self._tables.get(pattern)
+        if table is None:
+            table = self._tables[pattern] = list(pattern.finditer(self.text))
+        return table
+
+    @property
+    def comments(self) -> List:
+        return self._table(COMMENT_RE)
+
+    @property
+    def section_headers(self) -> List:
+        return self._table(SECTION_HEADER_RE)
+
+    @property
+    def references(self) -> List:
+        return self._table(REFERENCE_RE)
+
+    @property
+    def templates(self) -> List:
+        return self._table(TEMPLATE_RE)
+
+    @property
+    def wikilinks(self) -> List:
+        return self._table(WIKILINK_RE)
+
+    @property
+    def braces(self) -> List:
+        return self._table(BRACES_RE)
+
@@ -1,22 +1,46 @@
 """Various extractors."""
+import bisect
 import functools
 
 import regex
 from more_itertools import peekable
-from typing import Callable, Iterable, Iterator, List, TypeVar, NamedTuple
+from typing import (
+    Callable, Iterable, Iterator, List, MutableMapping, NamedTuple, Optional,
+    Tuple, TypeVar)
 
-from . import arxiv, doi, isbn, pubmed
-from .common import CaptureResult, Span
+from . import arxiv, combined, delta, doi, isbn, lexer, pubmed
+from .common import CaptureResult, Captures, Span, SymbolTable, fold_case
 
 
 class Section:
-    """Section class."""
-    def __init__(self, name: str, level: int, body: str):
-        """Instantiate a section."""
+    """Section class.
+
+    The body is not copied out of the document: the section keeps the
+    document and the offsets of the body in it, and slices it when asked.
+    """
+
+    __slots__ = ('name', 'level', '_source', '_body_begin', '_body_end')
+
+    def __init__(self,
+                 name: str,
+                 level: int,
+                 body: str='',
+                 source: Optional[str]=None,
+                 body_begin: int=0,
+                 body_end: Optional[int]=None):
+        """Instantiate a section, with either its body or its source."""
         self.name = name
         self.level = level
-        self.body = body
-        self._full_body = None
+        if source is None:
+            source, body_begin, body_end = body, 0, len(body)
+        self._source = source
+        self._body_begin = body_begin
+        self._body_end = len(source) if body_end is None else body_end
+
+    @property
+    def body(self) -> str:
+        """Get the body of the section, without the header."""
+        return self._source[self._body_begin:self._body_end]
 
     @property
     def is_preamble(self):
@@ -26,20 +50,21 @@ class Section:
     @property
     def full_body(self) -> str:
         """Get the full body of the section."""
-        if self._full_body is not None:
-            return self._full_body
-
         if self.is_preamble:
-            full_body = self.body
-        else:
-            equals = ''.join('=' for _ in range(self.level))
-            full_body = '{equals}{name}{equals}\n{body}'.format(
-                equals=equals,
-                name=self.name,
-                body=self.body,
-            )
-        self._full_body = full_body
-        return full_body
+            return self.body
+
+        equals = '=' * self.level
+        return equals + self.name + equals + '\n' + self.body
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Section):
+            return NotImplemented
+        return (self.name == other.name
+                and self.level == other.level
+                and self.body == other.body)
+
+    def __hash__(self) -> int:
+        return hash((self.name, self.level, self.body))
 
     def __repr__(self):
         'Return a nicely formatted representation string'
@@ -53,22 +78,9 @@ class Section:
         )
 
 
-section_header_re = regex.compile(
-    r'''^
-        (?P<equals>=+)              # Match the equals, greedy
-        (?P<section_name>           # <section_name>:
-            .+?                     # Text inside, non-greedy
-        )
-        (?P=equals)\s*              # Re-match the equals
-        $
-    ''', regex.VERBOSE | regex.MULTILINE)
+section_header_re = lexer.SECTION_HEADER_RE
 
-templates_re = regex.compile(
-    r'''
-        \{\{
-        (?P<content>(?s).*?)
-        \}\}
-    ''', regex.VERBOSE)
+templates_re = lexer.TEMPLATE_RE
 
 
 @functools.lru_cache(maxsize=1000)
@@ -78,23 +90,27 @@ def _pattern_or(words: List) -> str:
     return r'(?:{})'.format(words_joined)
 
 
-def references(source: str) -> Iterator[CaptureResult[str]]:
+def _tokens(source: str, tokens: Optional[lexer.Tokens]) -> lexer.Tokens:
+    """Return the tokens of the document, shared by the extractors called
+    on it, or new ones if not given.
+    """
+    return lexer.Tokens(source) if tokens is None else tokens
+
+
+def references(source: str, tokens: Optional[lexer.Tokens]=None) \
+        -> Iterator[CaptureResult[str]]:
     """Return all the references found in the document."""
-    pattern = regex.compile(
-        r'''
-            <ref
-            .*?
-            <\/ref>
-        ''', regex.VERBOSE | regex.IGNORECASE | regex.DOTALL)
-
-    for match in pattern.finditer(source):
+    for match in _tokens(source, tokens).references:
         yield CaptureResult(match.group(0), Span(*match.span()))
 
 
-def sections(source: str, include_preamble: bool=False) \
+def sections(source: str,
+             include_preamble: bool=False,
+             tokens: Optional[lexer.Tokens]=None) \
         -> Iterator[CaptureResult[Section]]:
     """Return the sections found in the document."""
-    section_header_matches = peekable(section_header_re.finditer(source))
+    section_header_matches = peekable(
+        _tokens(source, tokens).section_headers)
     if include_preamble:
         try:
             body_end = section_header_matches.peek().start()
@@ -104,7 +120,8 @@ def sections(source: str, include_preamble: bool=False) \
         preamble = Section(
             name='',
             level=0,
-            body=source[:body_end],
+            source=source,
+            body_end=body_end,
         )
         yield CaptureResult(preamble, Span(0, body_end))
 
@@ -122,7 +139,9 @@ def sections(source: str, include_preamble: bool=False) \
         section = Section(
             name=name,
             level=level,
-            body=source[body_begin:body_end],
+            source=source,
+            body_begin=body_begin,
+            body_end=body_end,
         )
 
         yield CaptureResult(section, Span(match.start(), body_end))
@@ -150,44 +169,242 @@ def sections(source: str, include_preamble: bool=False) \
 #         yield match.group(0)
 
 
-def templates(source: str) -> Iterator[CaptureResult[str]]:
+def templates(source: str, tokens: Optional[lexer.Tokens]=None) \
+        -> Iterator[CaptureResult[str]]:
     """Return all the templates found in the document."""
-    for match in templates_re.finditer(source):
+    for match in _tokens(source, tokens).templates:
         yield CaptureResult(match.group(0), Span(*match.span()))
 
 
+Template = NamedTuple('Template', [
+    ('name', str),
+    ('depth', int),
+])
+
+template_name_re = regex.compile(r'[^|{}]*')
+
+
+def _balanced_templates(source: str, tokens: Optional[lexer.Tokens]) \
+        -> Tuple[list, list, list, list]:
+    """Match the braces of the templates with a stack.
+
+    Return the templates, the index of their parents (None at depth 0) and,
+    for each brace, its position and the index of the innermost template
+    from it on. The braces left unbalanced are ignored.
+    """
+    begins = []
+    ends = []
+    parents = []
+    positions = []
+    innermost = []
+    stack = []
+    for match in _tokens(source, tokens).braces:
+        if match.group(0) == '{{':
+            parents.append(stack[-1] if stack else None)
+            stack.append(len(begins))
+            begins.append(match.start())
+            ends.append(None)
+            positions.append(match.start())
+            innermost.append(stack[-1])
+        elif stack:
+            ends[stack.pop()] = match.end()
+            positions.append(match.end())
+            innermost.append(stack[-1] if stack else None)
+
+    # The templates never closed are dropped, the closest of their ancestors
+    # which is closed takes their place.
+    new_indices = []
+    templates = []
+    new_parents = []
+    for i, (begin, end, parent) in enumerate(zip(begins, ends, parents)):
+        if parent is not None:
+            parent = new_indices[parent]
+        if end is None:
+            new_indices.append(parent)
+            continue
+        new_indices.append(len(templates))
+        name = template_name_re.match(source, begin + 2).group(0)
+        depth = 0 if parent is None else templates[parent].data.depth + 1
+        templates.append(CaptureResult(
+            Template(name=name.strip(), depth=depth),
+            Span(begin, end),
+        ))
+        new_parents.append(parent)
+    if stack:
+        innermost = [None if i is None else new_indices[i] for i in innermost]
+    return templates, new_parents, positions, innermost
+
+
+def balanced_templates(source: str, tokens: Optional[lexer.Tokens]=None) \
+        -> Iterator[CaptureResult[Template]]:
+    """Return all the templates found in the document, in order.
+
+    Unlike templates, the nested templates are matched correctly: each one
+    ends at its own closing braces and has the depth of its nesting.
+    """
+    templates, _, _, _ = _balanced_templates(source, tokens)
+    return iter(templates)
+
+
+class TemplateIndex:
+    """The templates of a document, by position.
+
+    The templates are nested, so the text between two consecutive braces is
+    always in the same innermost template: the index finds it with a binary
+    search on the braces.
+    """
+
+    def __init__(self, source: str, tokens: Optional[lexer.Tokens]=None):
+        """Scan the templates of the document."""
+        self.templates, self._parents, self._positions, self._innermost = \
+            _balanced_templates(source, tokens)
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def at(self, offset: int) -> Optional[CaptureResult[Template]]:
+        """Return the innermost template the offset is inside of, if any."""
+        i = self._innermost_index(offset)
+        return None if i is None else self.templates[i]
+
+    def containing(self, span: Span) -> Optional[CaptureResult[Template]]:
+        """Return the innermost template the span is inside of, if any."""
+        i = self._innermost_index(span.begin)
+        while i is not None and self.templates[i].span.end < span.end:
+            i = self._parents[i]
+        return None if i is None else self.templates[i]
+
+    def _innermost_index(self, offset: int) -> Optional[int]:
+        brace = bisect.bisect_right(self._positions, offset) - 1
+        return None if brace < 0 else self._innermost[brace]
+
+
 T = TypeVar('T')
 Extractor = Callable[[str], T]
 
 
-def pub_identifiers(source: str, extractors: Iterable[Extractor]=None) -> T:
-    """Return all the identifiers found in the document."""
+# The literals, one of which must appear in a text (see common.fold_case)
+# for each extractor to find something in it.
+ANCHORS = {
+    arxiv.extract: ('arxiv',),
+    doi.extract: ('10.',),
+    isbn.extract: ('isbn',),
+    pubmed.extract: ('pmid', 'pmc', 'ncbi.nlm.nih.gov'),
+    combined.extract: ('10.', 'isbn', 'pmid', 'pmc', 'arxiv',
+                       'ncbi.nlm.nih.gov'),
+}
+
+
+def _prefilter(
+        source: str,
+        extractors: Iterable[Extractor],
+        prefilter_stats: Optional[MutableMapping[str, int]]) \
+        -> Tuple[str, List[Extractor]]:
+    """Return the document folded (see fold_case) and the extractors whose
+    anchors appear in it.
+
+    The documents where some extractors run ('hits') and the ones skipped
+    altogether ('misses') are counted in prefilter_stats, if given.
+    """
+    folded_source = fold_case(source)
+    extractors = [
+        identifier_extractor
+        for identifier_extractor in extractors
+        if identifier_extractor not in ANCHORS
+        or any(anchor in folded_source
+               for anchor in ANCHORS[identifier_extractor])
+    ]
+    if prefilter_stats is not None:
+        prefilter_stats['hits' if extractors else 'misses'] += 1
+    return folded_source, extractors
+
+
+def pub_identifiers(
+        source: str,
+        extractors: Iterable[Extractor]=None,
+        prefilter_stats: Optional[MutableMapping[str, int]]=None) -> T:
+    """Return all the identifiers found in the document.
+
+    Only the extractors whose anchors appear in the document are run, see
+    _prefilter.
+    """
     if extractors is None:
-        extractors = (
-            arxiv.extract,
-            doi.extract,
-            isbn.extract,
-            pubmed.extract,
-        )
+        # Same as arxiv, doi, isbn and pubmed, in a single pass
+        extractors = (combined.extract,)
+
+    folded_source, extractors = _prefilter(
+        source, extractors, prefilter_stats)
     for identifier_extractor in extractors:
-        for capture in identifier_extractor(source):
+        if identifier_extractor is combined.extract:
+            captures = combined.extract(source, lowercase_text=folded_source)
+        else:
+            captures = identifier_extractor(source)
+        for capture in captures:
             yield capture
 
 
+def pub_identifier_arrays(
+        source: str,
+        prefilter_stats: Optional[MutableMapping[str, int]]=None,
+        symbols: Optional[SymbolTable]=None) -> Captures:
+    """Return all the identifiers found in the document, in arrays.
+
+    The same as pub_identifiers, without an object for each identifier
+    unless the captures are iterated over. The values are added to symbols,
+    if given.
+    """
+    folded_source, extractors = _prefilter(
+        source, (combined.extract,), prefilter_stats)
+    if not extractors:
+        return Captures(combined.TYPES, symbols)
+    return combined.extract_arrays(
+        source, symbols, lowercase_text=folded_source)
+
+
+def pub_identifier_extraction(
+        source: str,
+        previous: Optional[delta.Extraction]=None,
+        prefilter_stats: Optional[MutableMapping[str, int]]=None) \
+        -> delta.Extraction:
+    """Return all the identifiers found in the document, see
+    pub_identifier_arrays.
+
+    With the extraction of the previous revision of the document, only the
+    text around the change is scanned (see delta).
+    """
+    folded_source, extractors = _prefilter(
+        source, (combined.extract,), prefilter_stats)
+    if not extractors:
+        return delta.Extraction(
+            source, symbols=None if previous is None else previous.symbols)
+    return delta.extract(source, previous, lowercase_text=folded_source)
+
+
 class Wikilink:
     """Link class."""
+
+    __slots__ = ('link', 'anchor', 'section')
+
     def __init__(self,
                  link: str,
                  anchor: str,
-                 section_name: str,
-                 section_level: int,
-                 section_number: int):
-        """Instantiate a link."""
+                 section: 'SectionLimits'):
+        """Instantiate a link, in a section shared with the other links."""
         self.link = link
         self.anchor = anchor
-        self.section_name = section_name
-        self.section_level = section_level
-        self.section_number = section_number
+        self.section = section
+
+    @property
+    def section_name(self) -> str:
+        return self.section.name
+
+    @property
+    def section_level(self) -> int:
+        return self.section.level
+
+    @property
+    def section_number(self) -> int:
+        return self.section.number
 
     def __repr__(self):
         'Return a nicely formatted representation string'
@@ -198,39 +415,7 @@ class Wikilink:
             anchor=self.anchor,
         )
 
-# See https://regex101.com/r/kF0yC9/12
-# The text inside the 'link' group is title of the page, it is limited to 256
-# chars since it is the max supported by MediaWiki for page titles [1].
-# Furthermore pipes and brakets (|,[,]) are invalid characters for page
-# titles [2]. Furthermore, newlines are not allowed [3].
-# The anchor text allows pipes and closed brakets, but not open ones [3],
-# newlines are allowed [3].
-# See:
-# [1] https://en.wikipedia.org/w/index.php?title=Wikipedia:Wikipedia_records\
-#    &oldid=709472636#Article_with_longest_title
-# [2] https://www.mediawiki.org/w/index.php?title=Manual:$wgLegalTitleChars\
-#    &oldid=1274292
-# [3] https://it.wikipedia.org/w/index.php?\
-#   title=Utente:CristianCantoro/Sandbox&oldid=79784393#Test_regexp
-
-wikilink_re = regex.compile(
-    r'''\[\[                              # Match two opening brackets
-       (?P<link>                          # <link>:
-           [^\n\|\]\[\#\<\>\{\}]{0,256}   # Text inside link group
-                                          # everything not illegal, non-greedy
-                                          # can be empty or up to 256 chars
-       )
-       (?:                                # Non-capturing group
-          \|                              # Match a pipe
-          (?P<anchor>                     # <anchor>:
-              [^\[]*?                     # Test inside anchor group:
-                                          # match everything not an open braket
-                                          # - non greedy
-                                          # if empty the anchor text is link
-          )
-       )?                                 # anchor text is optional
-       \]\]                               # Match two closing brackets
-     ''', regex.VERBOSE | regex.MULTILINE)
+wikilink_re = lexer.WIKILINK_RE
 
 SectionLimits = NamedTuple('SectionLimits', [
     ('name', str),
@@ -241,10 +426,22 @@ SectionLimits = NamedTuple('SectionLimits', [
 ])
 
 
-def wikilinks(source: str, sections: Iterator[CaptureResult[Section]]) \
+# The section of the links before the first section.
+INCIPIT = SectionLimits(
+    name='---~--- incipit ---~---',
+    level=0,
+    number=0,
+    begin=0,
+    end=0,
+)
+
+
+def wikilinks(source: str,
+              sections: Iterator[CaptureResult[Section]],
+              tokens: Optional[lexer.Tokens]=None) \
         -> Iterator[CaptureResult[Wikilink]]:
     """Return the wikilinks found in the document."""
-    wikilink_matches = peekable(wikilink_re.finditer(source, concurrent=True))
+    wikilink_matches = _tokens(source, tokens).wikilinks
 
     sections_limits = [SectionLimits(name=section.name,
                                      level=section.level,
@@ -253,7 +450,9 @@ def wikilinks(source: str, sections: Iterator[CaptureResult[Section]]) \
                                      end=span.end)
                        for idx, (section, span) in enumerate(sections, 1)]
 
-    last_section_seen = 0
+    # The links and the sections are both in order: the section of each link
+    # is the last one beginning before it, if the link is not past its end.
+    next_section = 0
     for match in wikilink_matches:
         link = match.group('link') or ''
         link = link.strip()
@@ -263,18 +462,13 @@ def wikilinks(source: str, sections: Iterator[CaptureResult[Section]]) \
 
         link_start = match.start()
 
-        link_section_number = 0
-        link_section_name = '---~--- incipit ---~---'
-        link_section_level = 0
-
-        for section in sections_limits[last_section_seen:]:
-            if section.begin <= link_start <= section.end:
-                link_section_number = section.number
-                link_section_name = section.name
-                link_section_level = section.level
-                last_section_seen = (link_section_number - 1)\
-                    if link_section_number > 0 else 0
-                break
+        while next_section < len(sections_limits) \
+                and sections_limits[next_section].begin <= link_start:
+            next_section += 1
+        section = INCIPIT
+        if next_section > 0 \
+                and link_start <= sections_limits[next_section - 1].end:
+            section = sections_limits[next_section - 1]
 
         # For some reason if wikilink has no pipe, e.g. [[apple]] the regex
         # above captures everything in the anchor group, so we need to set
@@ -285,9 +479,7 @@ def wikilinks(source: str, sections: Iterator[CaptureResult[Section]]) \
         wikilink = Wikilink(
             link=link,
             anchor=anchor,
-            section_name=link_section_name,
-            section_level=link_section_level,
-            section_number=link_section_number
+            section=section,
         )
 
         yield CaptureResult(wikilink, Span(link_start, match.end()))
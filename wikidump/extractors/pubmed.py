@@ -4,7 +4,7 @@ Regular expressions taken from `python-mwcites` by Aaron Halfaker.
 See https://github.com/mediawiki-utilities/python-mwcites
 """
 import regex as re
-from typing import Iterator
+from typing import Iterator, Tuple
 
 from .common import CaptureResult, Identifier, Span
 
@@ -18,17 +18,29 @@ PMC_URL_RE = re.compile(r"//www\.ncbi\.nlm\.nih\.gov"
                         r"/pmc/articles/PMC([0-9]+)\b", re.I)
 
 
+def read(match) -> Tuple[str, int, int]:
+    """Return the id matched by one of the patterns, its begin and its end.
+    """
+    return (match.group(1),) + match.span(1)
+
+
+def capture_pmid(match) -> CaptureResult[Identifier]:
+    """Return the identifier matched by PMID_TEMPLATE_RE or PMID_URL_RE."""
+    return CaptureResult(Identifier('pmid', match.group(1)),
+                         Span(*match.span(1)))
+
+
+def capture_pmc(match) -> CaptureResult[Identifier]:
+    """Return the identifier matched by PMC_TEMPLATE_RE or PMC_URL_RE."""
+    return CaptureResult(Identifier('pmc', match.group(1)),
+                         Span(*match.span(1)))
+
+
 def extract(text: str) -> Iterator[CaptureResult[Identifier]]:
     for pmid_re in (PMID_TEMPLATE_RE, PMID_URL_RE):
         for match in pmid_re.finditer(text):
-            id_ = match.group(1)
-            span = match.span(1)
-            yield CaptureResult(
-                Identifier('pmid', id_), Span(*span))
+            yield capture_pmid(match)
 
     for pmc_re in (PMC_TEMPLATE_RE, PMC_URL_RE):
         for match in pmc_re.finditer(text):
-            id_ = match.group(1)
-            span = match.span(1)
-            yield CaptureResult(
-                Identifier('pmc', id_), Span(*span))
+            yield capture_pmc(match)
@@ -0,0 +1,141 @@
+"""Filter the pages of a dump before they reach the XML parser.
+
+The pages rejected are dropped from the raw stream as soon as their head
+(title, namespace, id) has been read: their revisions are skipped as raw
+bytes and never parsed nor decoded.
+"""
+from typing import IO, Iterable, Iterator, Optional
+
+from . import manifest, page_scanner
+
+
+class PageFilter:
+    """Select the pages by namespace, redirect, title and id."""
+
+    def __init__(self,
+                 namespaces: Optional[Iterable[int]]=None,
+                 skip_redirects: bool=False,
+                 titles: Optional[Iterable[str]]=None,
+                 page_ids: Optional[Iterable[int]]=None):
+        """Instantiate a filter, None means that any value is accepted."""
+        self.namespaces = None if namespaces is None else set(namespaces)
+        self.skip_redirects = skip_redirects
+        self.titles = None if titles is None else set(titles)
+        self.page_ids = None if page_ids is None else set(page_ids)
+
+    def accepts(self, page: page_scanner.PageInfo) -> bool:
+        """Return True if the page has to be processed."""
+        if self.namespaces is not None \
+                and page.namespace not in self.namespaces:
+            return False
+        if self.skip_redirects and page.redirect:
+            return False
+        if self.titles is not None or self.page_ids is not None:
+            return (page.title in (self.titles or ())
+                    or page.id in (self.page_ids or ()))
+        return True
+
+
+def get_page_filter(args) -> PageFilter:
+    """Parse the command line args and return the page filter."""
+    return PageFilter(
+        namespaces=args.namespaces,
+        skip_redirects=args.skip_redirects,
+        titles=args.pages or None,
+        page_ids=args.page_ids or None,
+    )
+
+
+def _accepted_pages(segments: Iterator[page_scanner.Segment],
+                    page_filter: PageFilter,
+                    start_after: Optional[int]) \
+        -> Iterator[page_scanner.Segment]:
+    accepted = True
+    skipping = start_after is not None
+    for segment in segments:
+        if segment.kind == page_scanner.PAGE_HEAD:
+            page = page_scanner.parse_page_head(segment.data)
+            accepted = not skipping and page_filter.accepts(page)
+            skipping = skipping and page.id != start_after
+        elif segment.kind in (page_scanner.HEADER, page_scanner.FOOTER):
+            accepted = True
+
+        if accepted:
+            yield segment
+
+
+def _new_revisions(segments: Iterator[page_scanner.Segment],
+                   page_manifest: manifest.Manifest) \
+        -> Iterator[page_scanner.Segment]:
+    """Drop the revisions already processed, and the pages left empty.
+
+    The head of the pages found in the manifest is held back until one of
+    their revisions is kept.
+    """
+    processed_until = None
+    page_head = None
+    for segment in segments:
+        if segment.kind == page_scanner.PAGE_HEAD:
+            page = page_scanner.parse_page_head(segment.data)
+            processed_until = page_manifest.last_revision_id(page.id)
+            if processed_until is not None:
+                page_head = segment
+                continue
+        elif segment.kind == page_scanner.REVISION \
+                and processed_until is not None:
+            revision_id = page_scanner.parse_revision_id(segment.data)
+            if revision_id <= processed_until:
+                continue
+            if page_head is not None:
+                yield page_head
+                page_head = None
+        elif segment.kind == page_scanner.PAGE_TAIL and page_head is not None:
+            page_head = None
+            continue
+
+        yield segment
+
+
+def _last_revisions(segments: Iterator[page_scanner.Segment]) \
+        -> Iterator[page_scanner.Segment]:
+    """Drop all the revisions of each page but the last one.
+
+    Only the last revision seen is held back, until the end of its page.
+    """
+    last_revision = None
+    for segment in segments:
+        if segment.kind == page_scanner.REVISION:
+            last_revision = segment
+            continue
+        elif last_revision is not None:
+            yield last_revision
+            last_revision = None
+
+        yield segment
+
+
+def filter_pages(xml_stream: IO[bytes],
+                 page_filter: PageFilter,
+                 only_last_revision: bool=False,
+                 start_after: Optional[int]=None,
+                 page_manifest: Optional[manifest.Manifest]=None) \
+        -> IO[bytes]:
+    """Return the dump without the pages rejected by the filter.
+
+    With only_last_revision, the revisions of every page but the last one
+    are dropped too.
+
+    With start_after, all the pages up to the one with this id, included,
+    are dropped.
+
+    With page_manifest, the revisions already processed are dropped, as
+    well as the pages without new revisions.
+    """
+    segments = _accepted_pages(
+        page_scanner.scan(xml_stream), page_filter, start_after)
+    if page_manifest is not None:
+        segments = _new_revisions(segments, page_manifest)
+    if only_last_revision:
+        segments = _last_revisions(segments)
+
+    return page_scanner.stream(segment.data for segment in segments)
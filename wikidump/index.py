@@ -0,0 +1,277 @@
+"""Index of the pages of a dump, for random access.
+
+The index maps the id and the title of every page to its offset and length
+in the decompressed dump, together with its number of revisions. It is a
+binary file meant to be memory mapped:
+
+* a header with the number of pages, the offset of the first page and the
+  offset of the end of the last page;
+* the fixed-size records of the pages, sorted by page id;
+* the position of each record in the title order;
+* the titles, UTF-8 encoded.
+"""
+import array
+import bisect
+import collections
+import mmap
+import os
+import pathlib
+import struct
+
+from typing import IO, Iterable, Iterator, Optional
+
+from . import page_scanner, utils
+
+MAGIC = b'WDINDEX1'
+HEADER_STRUCT = struct.Struct('<8sQQQ')
+RECORD_STRUCT = struct.Struct('<qQQQII')
+POSITION_STRUCT = struct.Struct('<I')
+
+IndexEntry = collections.namedtuple('IndexEntry', [
+    'id',
+    'title',
+    'offset',
+    'length',
+    'revisions',
+])
+
+
+def index_path(directory: pathlib.Path, dump_path: pathlib.Path) \
+        -> pathlib.Path:
+    """Return the path of the index of a dump."""
+    return directory/(dump_path.name + '.index')
+
+
+def scan_pages(xml_stream: IO[bytes]) -> Iterator[IndexEntry]:
+    """Yield the index entry of every page of the stream.
+
+    The first entry yielded has no title and no id: it describes the
+    header of the dump.
+    """
+    info = None
+    for kind, offset, data in page_scanner.scan(xml_stream):
+        if kind == page_scanner.HEADER:
+            yield IndexEntry(None, None, 0, len(data), 0)
+        elif kind == page_scanner.PAGE_HEAD:
+            info = page_scanner.parse_page_head(data)
+            begin = offset
+            revisions = 0
+        elif kind == page_scanner.REVISION:
+            revisions += 1
+        elif kind == page_scanner.PAGE_TAIL:
+            yield IndexEntry(
+                id=info.id,
+                title=info.title,
+                offset=begin,
+                length=offset + len(data) - begin,
+                revisions=revisions,
+            )
+
+
+def write_index(entries: Iterable[IndexEntry], output_h: IO[bytes]) -> None:
+    """Write the index of a dump, given the entries of scan_pages."""
+    entries = iter(entries)
+    header = next(entries)
+
+    ids = array.array('q')
+    offsets = array.array('Q')
+    lengths = array.array('Q')
+    revisions = array.array('I')
+    titles = []
+    for entry in entries:
+        ids.append(entry.id)
+        offsets.append(entry.offset)
+        lengths.append(entry.length)
+        revisions.append(entry.revisions)
+        titles.append(entry.title.encode('utf-8'))
+
+    by_id = sorted(range(len(ids)), key=ids.__getitem__)
+    title_offsets = []
+    title_offset = 0
+    for i in by_id:
+        title_offsets.append(title_offset)
+        title_offset += len(titles[i])
+
+    output_h.write(HEADER_STRUCT.pack(
+        MAGIC,
+        len(ids),
+        header.length,
+        offsets[-1] + lengths[-1] if ids else header.length,
+    ))
+    for position, i in enumerate(by_id):
+        output_h.write(RECORD_STRUCT.pack(
+            ids[i],
+            offsets[i],
+            lengths[i],
+            title_offsets[position],
+            len(titles[i]),
+            revisions[i],
+        ))
+    title_order = sorted(range(len(by_id)), key=lambda p: titles[by_id[p]])
+    for position in title_order:
+        output_h.write(POSITION_STRUCT.pack(position))
+    for i in by_id:
+        output_h.write(titles[i])
+
+
+class PageIndex:
+    """Memory mapped index of the pages of a dump."""
+
+    def __init__(self, path: pathlib.Path):
+        """Open the index at path."""
+        with open(str(path), 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._size, self.header_length, self.pages_end = \
+            HEADER_STRUCT.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError('{} is not a page index'.format(path))
+        self._records_offset = HEADER_STRUCT.size
+        self._title_order_offset = \
+            self._records_offset + self._size * RECORD_STRUCT.size
+        self._titles_offset = \
+            self._title_order_offset + self._size * POSITION_STRUCT.size
+
+        self._ids = _Column(self, self._id_at)
+        self._titles = _Column(self, self._title_at)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, position: int) -> IndexEntry:
+        if not 0 <= position < self._size:
+            raise IndexError(position)
+        id_, offset, length, title_offset, title_length, revisions = \
+            RECORD_STRUCT.unpack_from(
+                self._map,
+                self._records_offset + position * RECORD_STRUCT.size,
+            )
+        begin = self._titles_offset + title_offset
+        title = self._map[begin:begin + title_length].decode('utf-8')
+        return IndexEntry(id_, title, offset, length, revisions)
+
+    def _id_at(self, position: int) -> int:
+        offset = self._records_offset + position * RECORD_STRUCT.size
+        return struct.unpack_from('<q', self._map, offset)[0]
+
+    def _title_at(self, rank: int) -> bytes:
+        """Return the title of the page of the given rank in title order."""
+        position = self._title_position(rank)
+        _, _, _, title_offset, title_length, _ = RECORD_STRUCT.unpack_from(
+            self._map, self._records_offset + position * RECORD_STRUCT.size)
+        begin = self._titles_offset + title_offset
+        return self._map[begin:begin + title_length]
+
+    def _title_position(self, rank: int) -> int:
+        offset = self._title_order_offset + rank * POSITION_STRUCT.size
+        return POSITION_STRUCT.unpack_from(self._map, offset)[0]
+
+    def by_id(self, page_id: int) -> Optional[IndexEntry]:
+        """Return the entry of the page with the given id."""
+        position = bisect.bisect_left(self._ids, page_id)
+        if position < self._size and self._ids[position] == page_id:
+            return self[position]
+        return None
+
+    def by_title(self, title: str) -> Optional[IndexEntry]:
+        """Return the entry of the page with the given title."""
+        encoded = title.encode('utf-8')
+        rank = bisect.bisect_left(self._titles, encoded)
+        if rank < self._size and self._titles[rank] == encoded:
+            return self[self._title_position(rank)]
+        return None
+
+    def close(self) -> None:
+        """Close the index."""
+        self._map.close()
+
+
+class _Column:
+    """Sequence view of a column of the index, to be used with bisect."""
+
+    def __init__(self, index: PageIndex, getter):
+        self._index = index
+        self._getter = getter
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, position: int):
+        return self._getter(position)
+
+
+def _read_range(xml_stream: IO[bytes], begin: int, end: int,
+                position: int) -> Iterator[bytes]:
+    """Yield the bytes of the stream in [begin, end).
+
+    Seek to begin when the stream allows it, otherwise read and discard the
+    bytes before it.
+    """
+    if xml_stream.seekable():
+        xml_stream.seek(begin)
+    else:
+        while position < begin:
+            skipped = xml_stream.read(
+                min(begin - position, page_scanner.BLOCK_SIZE))
+            if not skipped:
+                raise EOFError('Dump shorter than expected by the index')
+            position += len(skipped)
+
+    while begin < end:
+        data = xml_stream.read(min(end - begin, page_scanner.BLOCK_SIZE))
+        if not data:
+            raise EOFError('Dump shorter than expected by the index')
+        begin += len(data)
+        yield data
+
+
+def select_pages(
+        xml_stream: IO[bytes],
+        page_index: PageIndex,
+        titles: Iterable[str]=(),
+        page_ids: Iterable[int]=()) -> IO[bytes]:
+    """Return a dump made only of the requested pages of xml_stream."""
+    entries = []
+    for title in titles:
+        entry = page_index.by_title(title)
+        if entry is None:
+            utils.log('Page not found in the index:', title)
+        else:
+            entries.append(entry)
+    for page_id in page_ids:
+        entry = page_index.by_id(page_id)
+        if entry is None:
+            utils.log('Page id not found in the index:', page_id)
+        else:
+            entries.append(entry)
+    entries = sorted(set(entries), key=lambda entry: entry.offset)
+
+    def dump_data():
+        yield from _read_range(xml_stream, 0, page_index.header_length, 0)
+        position = page_index.header_length
+        for entry in entries:
+            end = entry.offset + entry.length
+            yield from _read_range(xml_stream, entry.offset, end, position)
+            position = end
+        yield page_scanner.DUMP_END
+
+    return page_scanner.stream(dump_data())
+
+
+def configure_subparsers(subparsers):
+    """Configure the subparsers."""
+    parser = subparsers.add_parser(
+        'index',
+        help='Build the index of the pages of the dump, which allows to '
+             'extract single pages with --pages and --page-ids.',
+    )
+    parser.set_defaults(func=main, raw_input=True)
+
+
+def main(xml_stream: IO[bytes], input_file_path: pathlib.Path, args) -> None:
+    """Build the index of a dump and write it in the output directory."""
+    if args.dry_run:
+        path = os.devnull
+    else:
+        path = str(index_path(args.output_dir_path, input_file_path))
+    with open(path, 'wb') as output_h:
+        write_index(scan_pages(xml_stream), output_h)
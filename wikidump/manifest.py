@@ -0,0 +1,66 @@
+"""Manifest of a run, to extract incrementally from the next dumps.
+
+The manifest maps the id of every page processed to the id of the last
+revision processed and to the state of the processor after it (e.g. the
+identifiers found in the revision, for the diff with the next one). A run
+given the manifest of a previous one processes only the newer revisions,
+starting from the stored state, and outputs just the delta.
+"""
+import collections
+import os
+import pathlib
+import pickle
+
+from typing import Any, Mapping, Optional
+
+PageState = collections.namedtuple('PageState', [
+    'revision_id',
+    'state',
+])
+
+
+def manifest_path(output_dir: pathlib.Path, basename: str) -> pathlib.Path:
+    """Return the path of the manifest of a dump."""
+    return output_dir/(basename + '.manifest')
+
+
+class Manifest:
+    """The state of the pages of a previous run and the updates to it."""
+
+    def __init__(self,
+                 previous: Optional[Mapping[int, PageState]]=None,
+                 updates: Optional[Mapping[int, PageState]]=None):
+        """Instantiate a manifest, updates override previous."""
+        self.previous = previous or {}
+        self.updates = updates if updates is not None else {}
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> 'Manifest':
+        """Load the manifest saved at path."""
+        with open(str(path), 'rb') as f:
+            return cls(previous=pickle.load(f))
+
+    def save(self, path: pathlib.Path) -> None:
+        """Save the manifest, with the updates, at path."""
+        pages = dict(self.previous)
+        pages.update(self.updates)
+        temporary_path = str(path) + '.tmp'
+        with open(temporary_path, 'wb') as f:
+            pickle.dump(pages, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, str(path))
+
+    def get(self, page_id: int) -> Optional[PageState]:
+        """Return the state of a page, None if it was never processed."""
+        page_state = self.updates.get(page_id)
+        if page_state is None:
+            page_state = self.previous.get(page_id)
+        return page_state
+
+    def last_revision_id(self, page_id: int) -> Optional[int]:
+        """Return the id of the last revision processed of a page."""
+        page_state = self.get(page_id)
+        return None if page_state is None else page_state.revision_id
+
+    def update(self, page_id: int, revision_id: int, state: Any) -> None:
+        """Record the last revision processed of a page."""
+        self.updates[page_id] = PageState(revision_id, state)
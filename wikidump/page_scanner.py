@@ -0,0 +1,145 @@
+"""Locate pages and revisions in a raw XML dump, without parsing it.
+
+The text of the revisions is always escaped in the dumps, so every "<" found
+in the raw bytes belongs to a tag. The boundaries of pages and revisions can
+thus be found with a plain byte search, which is far cheaper than running an
+XML parser over the whole stream.
+"""
+import collections
+import html
+import io
+
+import regex as re
+from typing import IO, Iterable, Iterator, Optional
+
+BLOCK_SIZE = 2**20  # bytes read at once from the stream
+DUMP_END = b'</mediawiki>\n'
+
+HEADER = 'header'
+PAGE_HEAD = 'page_head'
+REVISION = 'revision'
+PAGE_TAIL = 'page_tail'
+FOOTER = 'footer'
+
+Segment = collections.namedtuple('Segment', [
+    'kind',
+    'offset',
+    'data',
+])
+
+PageInfo = collections.namedtuple('PageInfo', [
+    'id',
+    'title',
+    'namespace',
+    'redirect',
+])
+
+_tags_re = re.compile(rb'<(page|revision|/page|/mediawiki)>')
+_title_re = re.compile(rb'<title>(.*?)</title>', re.DOTALL)
+_namespace_re = re.compile(rb'<ns>(-?[0-9]+)</ns>')
+_id_re = re.compile(rb'<id>([0-9]+)</id>')
+_MAX_TAG_LENGTH = len(b'</mediawiki>')
+
+# The kind of the segment started by each tag.
+_segment_started_by = {
+    b'page': PAGE_HEAD,
+    b'revision': REVISION,
+    b'/page': PAGE_TAIL,
+    b'/mediawiki': FOOTER,
+}
+
+
+def _line_start(buf: bytearray, position: int, limit: int) -> int:
+    """Move position back over the indentation of its line."""
+    while position > limit and buf[position - 1] in b' \t':
+        position -= 1
+    return position
+
+
+def scan(stream: IO[bytes], block_size: int=BLOCK_SIZE) -> Iterator[Segment]:
+    """Split a decompressed XML dump in consecutive segments.
+
+    The segments tile the stream: the header (everything before the first
+    page), then for every page its head (title, namespace, id, ...), each one
+    of its revisions and its tail, and finally the footer. Each segment
+    starts at the beginning of the line of its opening tag, so the
+    concatenation of the data of all the segments gives back the stream.
+
+    Only one segment at a time is kept in memory.
+    """
+    buf = bytearray()
+    base = 0  # Offset in the stream of buf[0]
+    search_from = 0
+    kind = HEADER
+    eof = False
+
+    while True:
+        match = None if kind == FOOTER else _tags_re.search(buf, search_from)
+        if match is None:
+            if eof:
+                break
+            data = stream.read(block_size)
+            if not data:
+                eof = True
+            buf += data
+            search_from = max(
+                search_from, len(buf) - len(data) - _MAX_TAG_LENGTH)
+            continue
+
+        boundary = _line_start(buf, match.start(), 0)
+        yield Segment(kind, base, bytes(buf[:boundary]))
+
+        kind = _segment_started_by[match.group(1)]
+        del buf[:boundary]
+        base += boundary
+        search_from = match.end() - boundary
+
+    if buf or kind == FOOTER:
+        yield Segment(kind, base, bytes(buf))
+
+
+def parse_page_head(data: bytes) -> PageInfo:
+    """Extract the information about a page from the head of the page."""
+    title = _title_re.search(data)
+    namespace = _namespace_re.search(data)
+    id_ = _id_re.search(data)
+    return PageInfo(
+        id=int(id_.group(1)) if id_ else None,
+        title=html.unescape(title.group(1).decode('utf-8')) if title else None,
+        namespace=int(namespace.group(1)) if namespace else None,
+        redirect=b'<redirect' in data,
+    )
+
+
+def parse_revision_id(data: bytes) -> Optional[int]:
+    """Extract the id of a revision from its segment."""
+    id_ = _id_re.search(data)
+    return int(id_.group(1)) if id_ else None
+
+
+class IterStream(io.RawIOBase):
+    """Read-only stream of the bytes yielded by an iterable."""
+
+    def __init__(self, iterable: Iterable[bytes]):
+        """Instantiate a stream over iterable."""
+        self._iterator = iter(iterable)
+        self._pending = memoryview(b'')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            try:
+                self._pending = memoryview(next(self._iterator))
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def stream(iterable: Iterable[bytes]) -> IO[bytes]:
+    """Return a buffered stream of the bytes yielded by an iterable."""
+    return io.BufferedReader(IterStream(iterable), BLOCK_SIZE)
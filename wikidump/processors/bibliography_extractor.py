@@ -2,14 +2,16 @@
 import collections
 import datetime
 import functools
+import pathlib
 
-import fuzzywuzzy.process
 import jsonable
 import more_itertools
 import mwxml
-from typing import Iterable, Iterator, Mapping, NamedTuple, Optional
+from typing import (
+    Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple)
 
-from .. import dumper, extractors, languages, utils
+from .. import (
+    dumper, extractors, languages, revision_cache, section_classifier, utils)
 
 FUZZY_MATCH_CUTOFF = 91      # between 0, 100
 
@@ -83,13 +85,23 @@ features_template = '''
 '''
 
 stats_template = '''
+<%!
+    from wikidump.section_classifier import hit_rate
+%>\\
 <stats>
     <performance>
         <start_time>${stats['performance']['start_time'] | x}</start_time>
         <end_time>${stats['performance']['end_time'] | x}</end_time>
         <revisions_analyzed>${stats['performance']['revisions_analyzed'] | x}</revisions_analyzed>
         <pages_analyzed>${stats['performance']['pages_analyzed'] | x}</pages_analyzed>
+        <cache_hits>${stats['performance']['cache_hits'] | x}</cache_hits>
     </performance>
+    <section-classifier>
+        % for key in ['exact', 'cached', 'normalized', 'scored']:
+        <${key}>${stats['section_classifier'][key] | x}</${key}>
+        % endfor
+        <hit_rate>${'{:.4f}'.format(hit_rate(stats['section_classifier'])) | x}</hit_rate>
+    </section-classifier>
     <extracted-section-names>
         % for key in ['global', 'last_revision']:
         <${key}>
@@ -125,21 +137,64 @@ Page = NamedTuple('Page', [
 ])
 
 
+# The classifiers built so far, by language and cutoff.
+_bibliography_classifiers = {}
+
+
+def bibliography_classifier(
+        language: str,
+        score_cutoff: int=FUZZY_MATCH_CUTOFF) \
+        -> section_classifier.SectionClassifier:
+    """Return the classifier of the bibliography sections of a language."""
+    key = (language, score_cutoff)
+    classifier = _bibliography_classifiers.get(key)
+    if classifier is None:
+        classifier = section_classifier.SectionClassifier(
+            languages.bibliography[language],
+            score_cutoff=score_cutoff,
+        )
+        _bibliography_classifiers[key] = classifier
+    return classifier
+
+
 # TODO: instead of comparing section_name to a bib synonym,
 # search all the possible bib synonyms in the section name
-@functools.lru_cache(maxsize=500)
 def is_bibliography(
         section_name: str,
         language: str,
         score_cutoff: int=FUZZY_MATCH_CUTOFF) -> bool:
     """Check whether a section is a bibliography."""
-    bibliography_synonyms = languages.bibliography[language]
-    match = fuzzywuzzy.process.extractOne(
-        section_name,
-        bibliography_synonyms,
-        score_cutoff=score_cutoff,
+    return bibliography_classifier(language, score_cutoff)(section_name)
+
+
+def add_section_names_cache_argument(parser) -> None:
+    """Add the option to keep the classified section names between runs."""
+    parser.add_argument(
+        '--section-names-cache',
+        type=pathlib.Path,
+        required=False,
+        help='File where the section names classified as bibliography or '
+             'not are loaded from and saved to.',
+    )
+
+
+def revision_bibliography(mw_revision, language: str) \
+        -> Tuple[List[extractors.misc.Section], str]:
+    """Return the sections of a revision which are bibliography, and their
+    text.
+    """
+    text = utils.remove_comments(mw_revision.text or '')
+
+    sections = (section for section, _ in extractors.sections(text))
+
+    bibliography_sections = list(
+        section for section in sections
+        if is_bibliography(section.name, language)
     )
-    return bool(match)
+
+    # TODO: use section.fullbody
+    text = "".join(section.full_body for section in bibliography_sections)
+    return bibliography_sections, text
 
 
 def extract_revisions(
@@ -150,6 +205,7 @@ def extract_revisions(
     """Extract the sections which are bibliography from the revisions."""
     section_names_stats = stats['section_names']
     revisions = more_itertools.peekable(mw_page)
+    cache = revision_cache.RevisionCache(stats=stats['performance'])
     for mw_revision in revisions:
         utils.dot()
 
@@ -157,21 +213,15 @@ def extract_revisions(
         if only_last_revision and not is_last_revision:
             continue
 
-        text = utils.remove_comments(mw_revision.text or '')
-
-        sections = (section for section, _ in extractors.sections(text))
-
-        bibliography_sections = list(
-            section for section in sections
-            if is_bibliography(section.name, language)
+        bibliography_sections, text = cache.get(
+            mw_revision,
+            functools.partial(revision_bibliography, mw_revision, language),
         )
 
         for section in bibliography_sections:
             section_names_stats['global'][section.name] += 1
             if is_last_revision:
                 section_names_stats['last_revision'][section.name] += 1
-        # TODO: use section.fullbody
-        text = "".join(section.full_body for section in bibliography_sections)
 
         yield Revision(
             id=mw_revision.id,
@@ -198,11 +248,6 @@ def extract_pages(
     for mw_page in dump:
         utils.log("Processing", mw_page.title)
 
-        # Skip non-articles
-        if mw_page.namespace != 0:
-            utils.log('Skipped (namespace != 0)')
-            continue
-
         revisions_generator = extract_revisions(
             mw_page,
             language=language,
@@ -219,6 +264,24 @@ def extract_pages(
         stats['performance']['pages_analyzed'] += 1
 
 
+def new_stats() -> Mapping:
+    """Return the stats of the processor, before any page is analyzed."""
+    return {
+        'performance': {
+            'start_time': None,
+            'end_time': None,
+            'revisions_analyzed': 0,
+            'pages_analyzed': 0,
+            'cache_hits': 0,
+        },
+        'section_classifier': collections.Counter(),
+        'section_names': {
+            'global': collections.Counter(),
+            'last_revision': collections.Counter(),
+        },
+    }
+
+
 def configure_subparsers(subparsers):
     """Configure a new subparser."""
     parser = subparsers.add_parser(
@@ -236,27 +299,29 @@ def configure_subparsers(subparsers):
         action='store_true',
         help='Consider only the last revision for each page.',
     )
-    parser.set_defaults(func=main)
+    add_section_names_cache_argument(parser)
+    parser.set_defaults(func=main, new_stats=new_stats)
 
 
 def main(
         dump: Iterable[mwxml.Page],
         features_output_h,
         stats_output_h,
-        args) -> None:
-    """Main function that parses the arguments and writes the output."""
-    stats = {
-        'performance': {
-            'start_time': None,
-            'end_time': None,
-            'revisions_analyzed': 0,
-            'pages_analyzed': 0,
-        },
-        'section_names': {
-            'global': collections.Counter(),
-            'last_revision': collections.Counter(),
-        },
-    }
+        args,
+        stats: Optional[Mapping]=None) -> Mapping:
+    """Main function that parses the arguments and writes the output.
+
+    The stats collected so far can be given, they are updated in place.
+    """
+    if stats is None:
+        stats = new_stats()
+
+    classifier = bibliography_classifier(args.language)
+    if args.section_names_cache is not None:
+        classifier.load_cache(args.section_names_cache)
+    # Counted in the stats as the names are classified, so that they are
+    # saved along with them at each checkpoint
+    classifier.counters = stats['section_classifier']
 
     pages_generator = extract_pages(
         dump,
@@ -266,7 +331,8 @@ def main(
     )
 
     with features_output_h:
-        stats['performance']['start_time'] = datetime.datetime.utcnow()
+        if stats['performance']['start_time'] is None:
+            stats['performance']['start_time'] = datetime.datetime.utcnow()
         dumper.render_template(
             features_template,
             output_handler=features_output_h,
@@ -274,7 +340,13 @@ def main(
             pages=pages_generator,
             generator='youtux/wikidump',
         )
-        stats['performance']['end_time'] = datetime.datetime.utcnow()
+        # Given with an end, the stats of a finished run (e.g. merged from
+        # chunks) are only rendered
+        if stats['performance']['end_time'] is None:
+            stats['performance']['end_time'] = datetime.datetime.utcnow()
+
+    if args.section_names_cache is not None:
+        classifier.save_cache(args.section_names_cache)
 
     with stats_output_h:
         dumper.render_template(
@@ -282,3 +354,5 @@ def main(
             stats_output_h,
             stats=stats,
         )
+
+    return stats
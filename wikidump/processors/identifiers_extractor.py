@@ -7,9 +7,9 @@ import functools
 
 import more_itertools
 import mwxml
-from typing import Iterable, Mapping, Callable
+from typing import Iterable, List, Mapping, Callable, Optional, Sequence
 
-from .. import dumper, extractors, utils, languages
+from .. import dumper, extractors, manifest, revision_cache, utils, languages
 from . import bibliography_extractor
 
 features_template = '''
@@ -57,13 +57,29 @@ features_template = '''
 '''
 
 stats_template = '''
+<%!
+    from wikidump.section_classifier import hit_rate
+%>\\
 <stats>
     <performance>
         <start_time>${stats['performance']['start_time']}</start_time>
         <end_time>${stats['performance']['end_time']}</end_time>
         <revisions_analyzed>${stats['performance']['revisions_analyzed']}</revisions_analyzed>
         <pages_analyzed>${stats['performance']['pages_analyzed']}</pages_analyzed>
+        <cache_hits>${stats['performance']['cache_hits']}</cache_hits>
     </performance>
+    <prefilter>
+        <hits>${stats['prefilter']['hits']}</hits>
+        <misses>${stats['prefilter']['misses']}</misses>
+    </prefilter>
+    % if stats['section_classifier']:
+    <section-classifier>
+        % for key in ['exact', 'cached', 'normalized', 'scored']:
+        <${key}>${stats['section_classifier'][key]}</${key}>
+        % endfor
+        <hit_rate>${'{:.4f}'.format(hit_rate(stats['section_classifier']))}</hit_rate>
+    </section-classifier>
+    % endif
     <identifiers>
         % for key in ['global', 'last_revision']:
         <${key}>
@@ -87,6 +103,12 @@ Revision = collections.namedtuple('Revision', [
     'timestamp',
     'publication_identifiers_diff',
 ])
+# What is extracted from the text of a revision.
+RevisionIdentifiers = collections.namedtuple('RevisionIdentifiers', [
+    'extraction',
+    'stat_keys',
+    'identifiers_filtered',
+])
 
 
 def always_true(*args, **kwargs) -> bool:
@@ -128,17 +150,31 @@ def IdentifierStatsDict():
     }
 
 
-@utils.listify(wrapper=set)
 def where_appears(
-        span: extractors.common.Span,
-        **spans: Mapping[str, Iterable[extractors.common.Span]]):
-    """Find out where the current span appears, given a dict of spans."""
-    span_le = extractors.Span.__le__
-    for key, span_list in spans.items():
-        # if any(span <= other_span) for other_span in span_list):
-        # HACK: the following is more efficient. Sorry :(
-        if any(span_le(span, other_span) for other_span in span_list):
-            yield key
+        spans: Sequence[extractors.common.Span],
+        **indexes: extractors.common.SpanIndex) -> List[set]:
+    """Find out where each one of the spans appears, given a dict of indexes.
+    """
+    appearances = [set() for _ in spans]
+    for key, index in indexes.items():
+        for span_appearances, found in zip(appearances,
+                                           index.contains_all(spans)):
+            if found:
+                span_appearances.add(key)
+    return appearances
+
+
+def original_spans(
+        comments: utils.CommentMask,
+        spans: Iterable[extractors.common.Span]) \
+        -> List[extractors.common.Span]:
+    """Return the spans of the text without the comments as spans of the
+    original text.
+    """
+    if comments.text is comments.source:
+        return list(spans)
+    Span = extractors.common.Span
+    return [Span(*comments.original_span(*span)) for span in spans]
 
 
 def identifier_appearance_stat_key(appearances: set) -> str:
@@ -155,64 +191,121 @@ def identifier_appearance_stat_key(appearances: set) -> str:
         return 'only_in_raw_text'
 
 
+def revision_identifiers(
+        mw_revision,
+        previous: Optional[extractors.delta.Extraction],
+        section_filter: Callable[[extractors.misc.Section], bool],
+        prefilter_stats: Mapping) -> RevisionIdentifiers:
+    """Extract the identifiers from a revision, starting from the extraction
+    of the previous one.
+    """
+    # The extractors skip the comments, the spans of the captures are mapped
+    # back to the text of the revision
+    source = mw_revision.text or ''
+    comments = utils.CommentMask(
+        source, extractors.lexer.Tokens(source).comments)
+    text = comments.text
+    # The markup of the text is scanned once for all the extractors
+    tokens = extractors.lexer.Tokens(text)
+
+    sections_captures_filtered = list(
+        capture
+        for capture in extractors.sections(
+            text, include_preamble=True, tokens=tokens)
+        if section_filter(capture.data)
+    )
+
+    references_captures = list(extractors.references(text, tokens=tokens))
+
+    # The nested templates are inside the outermost ones
+    templates_captures = [
+        capture
+        for capture in extractors.balanced_templates(text, tokens=tokens)
+        if capture.data.depth == 0
+    ]
+
+    extraction = extractors.pub_identifier_extraction(
+        text, previous=previous, prefilter_stats=prefilter_stats)
+    identifiers_captures = extraction.captures()
+    identifiers = list(identifiers_captures.identifiers())
+
+    SpanIndex = extractors.common.SpanIndex
+    appearances = where_appears(
+        original_spans(comments, identifiers_captures.spans()),
+        references=SpanIndex(original_spans(
+            comments, (span for _, span in references_captures))),
+        templates=SpanIndex(original_spans(
+            comments, (span for _, span in templates_captures))),
+        sections=SpanIndex(original_spans(
+            comments, (span for _, span in sections_captures_filtered))),
+    )
+
+    return RevisionIdentifiers(
+        extraction=extraction,
+        stat_keys=[
+            identifier_appearance_stat_key(identifier_appearances)
+            for identifier_appearances in appearances
+        ],
+        identifiers_filtered=[
+            identifier
+            for identifier, identifier_appearances
+            in zip(identifiers, appearances)
+            if 'sections' in identifier_appearances
+        ],
+    )
+
+
 def extract_revisions(
         page: mwxml.Page,
         stats: Mapping,
         only_last_revision: bool,
         section_filter: Callable[[extractors.misc.Section], bool]=always_true,
+        page_manifest: Optional[manifest.Manifest]=None,
         ) -> Iterable[Revision]:
-    """Extract the identifiers from the revisions."""
+    """Extract the identifiers from the revisions.
+
+    With a manifest, the revisions already processed are skipped and the
+    diff starts from the identifiers of the last one of them.
+    """
     revisions = more_itertools.peekable(page)
 
     stats_identifiers = stats['identifiers']
 
-    prev_identifiers = set()
+    page_state = None
+    if page_manifest is not None:
+        page_state = page_manifest.get(page.id)
+
+    prev_identifiers = set() if page_state is None else page_state.state
+    # The identifiers of a revision are extracted from the previous one
+    extraction = None
+    cache = revision_cache.RevisionCache(stats=stats['performance'])
     for mw_revision in revisions:
         utils.dot()
 
+        if page_state is not None \
+                and mw_revision.id <= page_state.revision_id:
+            continue
+
         is_last_revision = not utils.has_next(revisions)
         if only_last_revision and not is_last_revision:
             continue
 
-        text = utils.remove_comments(mw_revision.text or '')
-
-        sections_captures_filtered = list(
-            capture
-            for capture in extractors.sections(text, include_preamble=True)
-            if section_filter(capture.data)
-        )
-
-        references_captures = list(extractors.references(text))
-
-        templates_captures = list(extractors.templates(text))
-
-        identifiers_captures = list(extractors.pub_identifiers(text))
-        identifiers = [identifier for identifier, _ in identifiers_captures]
-
-        # TODO: check if funziona
-        where = functools.partial(
-            where_appears,
-            references=[span for _, span in references_captures],
-            templates=[span for _, span in templates_captures],
-            sections=[span for _, span in sections_captures_filtered],
-        )
-
-        identifiers_with_appearances = [
-            (identifier, where(span))
-            for identifier, span in identifiers_captures
-        ]
+        features = cache.get(mw_revision, functools.partial(
+            revision_identifiers,
+            mw_revision,
+            previous=extraction,
+            section_filter=section_filter,
+            prefilter_stats=stats['prefilter'],
+        ))
+        # The next revision is extracted from this one, even if cached
+        extraction = features.extraction
 
-        for identifier, appearances in identifiers_with_appearances:
-            key_to_increment = identifier_appearance_stat_key(appearances)
+        for key_to_increment in features.stat_keys:
             stats_identifiers['global'][key_to_increment] += 1
             if is_last_revision:
                 stats_identifiers['last_revision'][key_to_increment] += 1
 
-        identifiers_filtered = [
-            identifier
-            for identifier, appearances in identifiers_with_appearances
-            if 'sections' in appearances
-        ]
+        identifiers_filtered = features.identifiers_filtered
 
         yield Revision(
             id=mw_revision.id,
@@ -224,6 +317,8 @@ def extract_revisions(
 
         stats['performance']['revisions_analyzed'] += 1
         prev_identifiers = identifiers_filtered
+        if page_manifest is not None:
+            page_manifest.update(page.id, mw_revision.id, prev_identifiers)
 
 
 def extract_pages(
@@ -231,21 +326,18 @@ def extract_pages(
         stats: Mapping,
         only_last_revision: bool,  # TODO: default value to False
         section_filter: Callable[[extractors.misc.Section], bool]=always_true,
+        page_manifest: Optional[manifest.Manifest]=None,
         ) -> Iterable[Page]:
     """"Extract the pages from the dump."""
     for mw_page in dump:
         utils.log("Processing", mw_page.title)
 
-        # Skip non-articles
-        if mw_page.namespace != 0:
-            utils.log('Skipped (namespace != 0)')
-            continue
-
         revisions_generator = extract_revisions(
             mw_page,
             stats=stats,
             only_last_revision=only_last_revision,
             section_filter=section_filter,
+            page_manifest=page_manifest,
         )
 
         yield Page(
@@ -256,6 +348,28 @@ def extract_pages(
         stats['performance']['pages_analyzed'] += 1
 
 
+def new_stats() -> Mapping:
+    """Return the stats of the processor, before any page is analyzed."""
+    return {
+        'performance': {
+            'start_time': None,
+            'end_time': None,
+            'revisions_analyzed': 0,
+            'pages_analyzed': 0,
+            'cache_hits': 0,
+        },
+        'prefilter': {
+            'hits': 0,
+            'misses': 0,
+        },
+        'section_classifier': collections.Counter(),
+        'identifiers': {
+            'global': IdentifierStatsDict(),
+            'last_revision': IdentifierStatsDict(),
+        },
+    }
+
+
 def configure_subparsers(subparsers):
     """Configure the subparsers."""
     parser = subparsers.add_parser(
@@ -280,44 +394,60 @@ pubmed).''',
         required=False,
         help='The language of the dump.',
     )
-    parser.set_defaults(func=main)
+    bibliography_extractor.add_section_names_cache_argument(parser)
+    parser.set_defaults(
+        func=main, new_stats=new_stats, supports_manifest=True)
 
 
 def main(dump: mwxml.Dump,
          features_output_h,
          stats_output_h,
-         args):
-    """Main function that parses the arguments and writes the output."""
-    stats = {
-        'performance': {
-            'start_time': None,
-            'end_time': None,
-            'revisions_analyzed': 0,
-            'pages_analyzed': 0,
-        },
-        'identifiers': {
-            'global': IdentifierStatsDict(),
-            'last_revision': IdentifierStatsDict(),
-        },
-    }
+         args,
+         stats: Optional[Mapping]=None,
+         page_manifest: Optional[manifest.Manifest]=None) -> Mapping:
+    """Main function that parses the arguments and writes the output.
+
+    The stats collected so far can be given, they are updated in place.
+    With a manifest, only the new revisions are processed and the manifest
+    is updated.
+    """
+    if stats is None:
+        stats = new_stats()
     print(args)
 
     section_filter = get_section_filter(args)
+    classifier = None
+    if args.filter_sections == 'bibliography':
+        classifier = bibliography_extractor.bibliography_classifier(
+            args.language)
+        if args.section_names_cache is not None:
+            classifier.load_cache(args.section_names_cache)
+        # Counted in the stats as the names are classified, so that they
+        # are saved along with them at each checkpoint
+        classifier.counters = stats['section_classifier']
     pages_generator = extract_pages(
         dump,
         stats=stats,
         only_last_revision=args.only_last_revision,
         section_filter=section_filter,
+        page_manifest=page_manifest,
     )
 
     with features_output_h:
-        stats['performance']['start_time'] = datetime.datetime.utcnow()
+        if stats['performance']['start_time'] is None:
+            stats['performance']['start_time'] = datetime.datetime.utcnow()
         dumper.render_template(
             features_template,
             output_handler=features_output_h,
             pages=pages_generator,
         )
-        stats['performance']['end_time'] = datetime.datetime.utcnow()
+        # Given with an end, the stats of a finished run (e.g. merged from
+        # chunks) are only rendered
+        if stats['performance']['end_time'] is None:
+            stats['performance']['end_time'] = datetime.datetime.utcnow()
+
+    if classifier is not None and args.section_names_cache is not None:
+        classifier.save_cache(args.section_names_cache)
 
     with stats_output_h:
         dumper.render_template(
@@ -325,3 +455,5 @@ def main(dump: mwxml.Dump,
             stats_output_h,
             stats=stats,
         )
+
+    return stats
@@ -4,21 +4,35 @@ The output format is csv.
 
 The program analyze one page at a time, and it outputs the history of the
 identifier of the page.
+
+The history is built in a single pass over the revisions, sorted by
+timestamp: the intervals in which each identifier appears are written as
+soon as they end. Only the identifiers currently in the page are kept in
+memory, the revisions are sorted in a temporary file.
+
+The revisions can also be taken each one after its parent, and the ones
+undone by a revert left out: the order is then computed on the graph of the
+revisions (see revision_graph).
 """
+import array
 import collections
 import csv
-import datetime
-import itertools
+import functools
+import pickle
+import tempfile
 
-import more_itertools
 import mwxml
-import networkx
+from typing import IO, Any, Iterable, Iterator, Optional, Set, Tuple
+
+from .. import extractors, revision_cache, revision_graph, utils
 
-from .. import extractors, utils
+# The revisions of a page are kept in memory up to this size (in bytes), on
+# disk after it.
+SPOOL_SIZE = 16 * 2**20
 
-PageHistoryElem = collections.namedtuple(
-    'PageHistoryElem',
-    'identifier revision_id timestamp action',
+Interval = collections.namedtuple(
+    'Interval',
+    'identifier start end',
 )
 
 Revision = collections.namedtuple(
@@ -39,121 +53,217 @@ pubmed).''',
         required=True,
         help='Wikimedia project.',
     )
+    parser.add_argument(
+        '--order',
+        choices=('timestamp', 'topological'),
+        default='timestamp',
+        help='Order of the revisions: by timestamp, or each one after its '
+             'parent [default: timestamp].',
+    )
+    parser.add_argument(
+        '--skip-reverted',
+        action='store_true',
+        help='Skip the revisions undone by a revert to a previous text.',
+    )
     parser.set_defaults(func=main)
 
 
-def identifiers_in_revision(mw_revision):
-    utils.dot()
+def revision_identifiers(
+        mw_revision,
+        previous: Optional[extractors.delta.Extraction],
+        symbols: extractors.common.SymbolTable) \
+        -> Tuple[extractors.delta.Extraction, Set[int]]:
+    """Return the extraction of a revision, starting from the previous one,
+    and the ids in symbols of its identifiers.
+    """
     text = utils.remove_comments(mw_revision.text or '')
-    identifiers = [
-        # extractors.common.Identifier(sys.intern(identifier.type), sys.intern(identifier.id))
-        identifier
-        for identifier, _ in extractors.pub_identifiers(text)
-    ]
-    return identifiers
+    extraction = extractors.pub_identifier_extraction(
+        text, previous=previous)
+    # Only diffed, the identifiers are needed once each
+    identifiers = extraction.captures().distinct_identifiers()
+    return extraction, {symbols.id(identifier) for identifier in identifiers}
+
+
+def identifiers_in_revisions(
+        revisions: Iterable,
+        symbols: extractors.common.SymbolTable) \
+        -> Iterator[Tuple[Any, Set[int]]]:
+    """Return each revision with the ids in symbols of its identifiers.
 
+    The identifiers of a revision are extracted from the previous one, the
+    ones of a text already seen in the page are reused.
+    """
+    extraction = None
+    cache = revision_cache.RevisionCache()
+    for mw_revision in revisions:
+        utils.dot()
+        extraction, identifiers = cache.get(mw_revision, functools.partial(
+            revision_identifiers, mw_revision, extraction, symbols))
+        yield mw_revision, identifiers
 
-def revisions_topology(revisions):
-    topology = networkx.DiGraph()
+
+def revisions_topology(revisions: Iterable,
+                       revert_aware: bool=False) \
+        -> revision_graph.RevisionGraph:
+    """Return the graph of the revisions, with their contents if
+    revert_aware.
+    """
+    graph = revision_graph.RevisionGraph()
     for revision in revisions:
-        timestamp = datetime.datetime.fromtimestamp(
-            revision.timestamp.unix(),
-            datetime.timezone.utc,
-        )
-        # if timestamp < datetime.datetime(2007,12,1, tzinfo=datetime.timezone.utc):
-        #     continue
-        # Much RAM is used. Maybe use some mechanism of string intern?
-        topology.add_node(
+        graph.add(
             revision.id,
-            timestamp=timestamp,
-            # identifiers=identifiers_in_revision(revision),
+            revision.parent_id,
+            revision.timestamp.unix(),
+            revision_cache.content_key(revision) if revert_aware else None,
         )
-        topology.add_edge(revision.parent_id, revision.id)
+    return graph
 
-    return topology
 
-    # history_by_topological_sort = [
-    #     (revision_id, topology.node[revision_id]['timestamp'],  topology.node[revision_id]['identifiers'])
-    #     for revision_id in networkx.topological_sort(topology)
-    #     if revision_id is not None
-    # ]
+def spool_revisions(revisions: Iterable[Revision], spool: IO[bytes]) \
+        -> Tuple[int, bool]:
+    """Write the revisions to spool, return how many they are and whether
+    they are sorted by timestamp and id.
+    """
+    count = 0
+    is_sorted = True
+    last_key = None
+    for revision in revisions:
+        key = (revision.timestamp, revision.id)
+        if last_key is not None and key < last_key:
+            is_sorted = False
+        last_key = key
+        pickle.dump(revision, spool, pickle.HIGHEST_PROTOCOL)
+        count += 1
+    return count, is_sorted
 
 
-def main(dump: mwxml.Dump,
-         features_output_h,
-         stats_output_h,
-         args):
-    """Main function that parses the arguments and writes the output."""
-    print(args)
+def sorted_revisions(revisions: Iterable[Revision]) -> Iterator[Revision]:
+    """Return the revisions sorted by timestamp and id.
 
-    writer = csv.writer(features_output_h)
+    The revisions are written to a temporary file, on disk once it gets
+    large, and read back in order. If they are not already sorted, only
+    their timestamps and ids are sorted in memory.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+        count, is_sorted = spool_revisions(revisions, spool)
+        spool.seek(0)
+        if is_sorted:
+            for _ in range(count):
+                yield pickle.load(spool)
+            return
 
-    for mw_page in dump:
-        utils.log('Analyzing ', mw_page.title)
+        positions = []
+        for _ in range(count):
+            position = spool.tell()
+            revision = pickle.load(spool)
+            positions.append((revision.timestamp, revision.id, position))
+        positions.sort()
+        for _, _, position in positions:
+            spool.seek(position)
+            yield pickle.load(spool)
 
-        if mw_page.namespace != 0:
-            utils.log('Skipped (namespace != 0)')
-            continue
 
-        revisions = more_itertools.peekable(mw_page)
+def graph_ordered_revisions(
+        revisions: Iterable[Tuple[Any, Revision]],
+        topological: bool=False,
+        skip_reverted: bool=False) -> Iterator[Revision]:
+    """Return the revisions sorted by timestamp and id, or in topological
+    order (see revision_graph.RevisionGraph.topological_order).
 
-        history = [
-            Revision(
-                revision.id,
-                revision.timestamp,
-                identifiers_in_revision(revision),
-            )
-            for revision in revisions
-        ]
+    With skip_reverted, the revisions undone by an identity revert are left
+    out. The revisions come with the ones read from the dump, which are
+    added to the graph; the revisions are read back from a temporary file.
+    """
+    offsets = array.array('q')
 
-        history.sort(key=lambda r: (r.timestamp, r.id))
+    def spooled(spool):
+        for mw_revision, revision in revisions:
+            offsets.append(spool.tell())
+            pickle.dump(revision, spool, pickle.HIGHEST_PROTOCOL)
+            yield mw_revision
 
-        first_rev = history[0]
-        history_with_empty_first = itertools.chain(
-            [Revision(first_rev.id, first_rev.timestamp, [])],
-            history,
-        )
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+        graph = revisions_topology(spooled(spool), revert_aware=skip_reverted)
+        missing_parents = graph.missing_parents()
+        if missing_parents:
+            utils.log('{} revisions with a missing parent'.format(
+                len(missing_parents)))
 
-        diff_history = [
-            (r2.id, r2.timestamp, utils.diff(r1.identifiers, r2.identifiers))
-            for r1, r2 in utils.pairwise(history_with_empty_first)
-        ]
+        if topological:
+            order = graph.topological_order()
+        else:
+            order = graph.timestamp_order()
+        if skip_reverted:
+            reverted = graph.reverted(order)
+            order = [index for index in order if not reverted[index]]
 
-        page_history = [
-            PageHistoryElem(identifier, revision_id, timestamp, action)
-            for revision_id, timestamp, diffs in diff_history
-            for action, identifier in diffs
-        ]
+        for index in order:
+            spool.seek(offsets[index])
+            yield pickle.load(spool)
 
-        page_history.sort(
-            key=lambda r: (r.identifier, r.timestamp, r.revision_id)
-        )
 
-        lastvalue = PageHistoryElem(
-            identifier=None,
-            timestamp=None,
-            revision_id=None,
-            action='removed',
-        )
+def identifier_intervals(revisions: Iterable[Revision]) \
+        -> Iterator[Interval]:
+    """Return the intervals of time in which the identifiers appear in the
+    revisions, sorted by timestamp.
 
-        page_history_by_identifier = itertools.groupby(
-            page_history,
-            key=lambda r: (r.identifier),
+    An interval is returned as soon as it ends, the ones still open after
+    the last revision end with None. Only the open ones are kept.
+    """
+    starts = {}
+    for revision in revisions:
+        identifiers = revision.identifiers
+        for identifier in sorted(starts.keys() - identifiers):
+            yield Interval(identifier, starts.pop(identifier),
+                           revision.timestamp)
+        for identifier in identifiers:
+            if identifier not in starts:
+                starts[identifier] = revision.timestamp
+    for identifier in sorted(starts):
+        yield Interval(identifier, starts[identifier], None)
+
+
+def main(dump: mwxml.Dump,
+         features_output_h,
+         stats_output_h,
+         args):
+    """Main function that parses the arguments and writes the output."""
+    print(args)
+
+    writer = csv.writer(features_output_h)
+
+    for mw_page in dump:
+        utils.log('Analyzing ', mw_page.title)
+
+        # The revisions keep the ids of their identifiers, each identifier is
+        # kept once for the whole page.
+        symbols = extractors.common.SymbolTable()
+        revisions = (
+            (revision,
+             Revision(revision.id, str(revision.timestamp), identifiers))
+            for revision, identifiers in identifiers_in_revisions(
+                mw_page, symbols)
         )
+        if args.order == 'timestamp' and not args.skip_reverted:
+            revisions = sorted_revisions(
+                revision for _, revision in revisions)
+        else:
+            revisions = graph_ordered_revisions(
+                revisions,
+                topological=args.order == 'topological',
+                skip_reverted=args.skip_reverted,
+            )
 
-        for identifier, actions in page_history_by_identifier:
-            for r1, r2 in utils.grouper(actions, 2, fillvalue=lastvalue):
-                assert r1.action != r2.action
-                assert r2.timestamp is None or r1.timestamp <= r2.timestamp
-
-                writer.writerow((
-                    args.project,
-                    mw_page.id,
-                    mw_page.title,
-                    identifier.type,
-                    identifier.id,
-                    r1.timestamp,
-                    r2.timestamp,
-                ))
+        for interval in identifier_intervals(revisions):
+            identifier = symbols.value(interval.identifier)
+            writer.writerow((
+                args.project,
+                mw_page.id,
+                mw_page.title,
+                identifier.type,
+                identifier.id,
+                interval.start,
+                interval.end,
+            ))
 
     features_output_h.close()
@@ -1,12 +1,13 @@
 """Count the number of sections per article and the section names."""
 import collections
 import datetime
+import functools
 
 import more_itertools
 import mwxml
-from typing import Mapping
+from typing import List, Mapping, Optional
 
-from .. import dumper, extractors, utils
+from .. import dumper, extractors, revision_cache, utils
 
 
 stats_template = '''
@@ -16,6 +17,7 @@ stats_template = '''
         <end_time>${stats['performance']['end_time']}</end_time>
         <revisions_analyzed>${stats['performance']['revisions_analyzed']}</revisions_analyzed>
         <pages_analyzed>${stats['performance']['pages_analyzed']}</pages_analyzed>
+        <cache_hits>${stats['performance']['cache_hits']}</cache_hits>
     </performance>
     <section-names-per-revision>
         % for key in ['global', 'last_revision']:
@@ -43,6 +45,14 @@ stats_template = '''
 '''
 
 
+def revision_section_names(mw_revision) -> List[str]:
+    """Return the names of the sections of a revision, normalized."""
+    text = utils.remove_comments(mw_revision.text or '')
+    tokens = extractors.lexer.Tokens(text)
+    return [section.name.strip().lower()
+            for section, _ in extractors.sections(text, tokens=tokens)]
+
+
 def analyze_revisions(
         page: mwxml.Page,
         stats: Mapping,
@@ -53,6 +63,7 @@ def analyze_revisions(
     section_names_stats = stats['section_names_per_revision']
     sections_stats = stats['sections_per_revision']
 
+    cache = revision_cache.RevisionCache(stats=stats['performance'])
     for mw_revision in revisions:
         utils.dot()
 
@@ -60,10 +71,8 @@ def analyze_revisions(
         if only_last_revision and not is_last_revision:
             continue
 
-        text = utils.remove_comments(mw_revision.text or '')
-
-        section_names = [section.name.strip().lower()
-                         for section, _ in extractors.sections(text)]
+        section_names = cache.get(
+            mw_revision, functools.partial(revision_section_names, mw_revision))
         sections_count = len(section_names)
 
         for section_name in section_names:
@@ -90,11 +99,6 @@ def analyze_pages(
     for mw_page in dump:
         utils.log("Processing", mw_page.title)
 
-        # Skip non-articles
-        if mw_page.namespace != 0:
-            utils.log('Skipped (namespace != 0)')
-            continue
-
         analyze_revisions(
             mw_page,
             stats=stats,
@@ -104,6 +108,28 @@ def analyze_pages(
         stats['performance']['pages_analyzed'] += 1
 
 
+def new_stats() -> Mapping:
+    """Return the stats of the processor, before any page is analyzed."""
+    return {
+        'sections_per_revision': {
+            'global': collections.Counter(),
+            'last_revision': collections.Counter(),
+        },
+        'section_names_per_revision': {
+            'global': collections.Counter(),
+            'last_revision': collections.Counter(),
+        },
+        'revisions': collections.Counter(),
+        'performance': {
+            'start_time': None,
+            'end_time': None,
+            'revisions_analyzed': 0,
+            'pages_analyzed': 0,
+            'cache_hits': 0,
+        }
+    }
+
+
 def configure_subparsers(subparsers) -> None:
     """Configure the subparsers."""
     parser = subparsers.add_parser(
@@ -115,39 +141,32 @@ def configure_subparsers(subparsers) -> None:
         action='store_true',
         help='Consider only the last revision for each page.',
     )
-    parser.set_defaults(func=main)
+    parser.set_defaults(func=main, new_stats=new_stats)
 
 
 def main(
         dump: mwxml.Dump,
         features_output_h,
         stats_output_h,
-        args):
-    """Main function that parses the arguments and writes the output."""
-    stats = {
-        'sections_per_revision': {
-            'global': collections.Counter(),
-            'last_revision': collections.Counter(),
-        },
-        'section_names_per_revision': {
-            'global': collections.Counter(),
-            'last_revision': collections.Counter(),
-        },
-        'revisions': collections.Counter(),
-        'performance': {
-            'start_time': None,
-            'end_time': None,
-            'revisions_analyzed': 0,
-            'pages_analyzed': 0,
-        }
-    }
-    stats['performance']['start_time'] = datetime.datetime.utcnow()
+        args,
+        stats: Optional[Mapping]=None) -> Mapping:
+    """Main function that parses the arguments and writes the output.
+
+    The stats collected so far can be given, they are updated in place.
+    """
+    if stats is None:
+        stats = new_stats()
+    if stats['performance']['start_time'] is None:
+        stats['performance']['start_time'] = datetime.datetime.utcnow()
     analyze_pages(
         dump,
         stats=stats,
         only_last_revision=args.only_last_revision,
     )
-    stats['performance']['end_time'] = datetime.datetime.utcnow()
+    # Given with an end, the stats of a finished run (e.g. merged from
+    # chunks) are only rendered
+    if stats['performance']['end_time'] is None:
+        stats['performance']['end_time'] = datetime.datetime.utcnow()
 
     with stats_output_h:
         dumper.render_template(
@@ -155,3 +174,5 @@ def main(
             stats_output_h,
             stats=stats,
         )
+
+    return stats
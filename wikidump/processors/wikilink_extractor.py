@@ -12,9 +12,10 @@ import fuzzywuzzy.process
 import jsonable
 import more_itertools
 import mwxml
-from typing import Iterable, Iterator, Mapping, NamedTuple, Optional
+from typing import (
+    Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple)
 
-from .. import dumper, extractors, languages, utils
+from .. import dumper, extractors, languages, revision_cache, utils
 
 Revision = NamedTuple('Revision', [
     ('id', int),
@@ -38,6 +39,22 @@ Page = NamedTuple('Page', [
 ])
 
 
+def revision_wikilinks(mw_revision) \
+        -> Tuple[str, List[extractors.misc.Wikilink]]:
+    """Return the text of a revision, without comments, and its wikilinks.
+    """
+    text = utils.remove_comments(mw_revision.text or '')
+    # The sections and the links are read from the same tokens
+    tokens = extractors.lexer.Tokens(text)
+    wikilinks = [wikilink
+                 for wikilink, _
+                 in extractors.wikilinks(
+                     text,
+                     extractors.sections(text, tokens=tokens),
+                     tokens=tokens)]
+    return text, wikilinks
+
+
 def extract_revisions(
         mw_page: mwxml.Page,
         language: str,
@@ -46,6 +63,7 @@ def extract_revisions(
     """Extract the internall links (wikilinks) from the revisions."""
 
     revisions = more_itertools.peekable(mw_page)
+    cache = revision_cache.RevisionCache(stats=stats['performance'])
     for mw_revision in revisions:
         utils.dot()
 
@@ -53,11 +71,8 @@ def extract_revisions(
         if only_last_revision and not is_last_revision:
             continue
 
-        text = utils.remove_comments(mw_revision.text or '')
-
-        wikilinks = (wikilink
-                     for wikilink, _
-                     in extractors.wikilinks(text, extractors.sections(text)))
+        text, wikilinks = cache.get(
+            mw_revision, functools.partial(revision_wikilinks, mw_revision))
 
         yield Revision(
             id=mw_revision.id,
@@ -82,11 +97,6 @@ def extract_pages(
     for mw_page in dump:
         utils.log("Processing", mw_page.title)
 
-        # Skip non-articles
-        if mw_page.namespace != 0:
-            utils.log('Skipped (namespace != 0)')
-            continue
-
         revisions_generator = extract_revisions(
             mw_page,
             language=language,
@@ -102,6 +112,23 @@ def extract_pages(
         )
 
 
+def new_stats() -> Mapping:
+    """Return the stats of the processor, before any page is analyzed."""
+    return {
+        'performance': {
+            'start_time': None,
+            'end_time': None,
+            'revisions_analyzed': 0,
+            'pages_analyzed': 0,
+            'cache_hits': 0,
+        },
+        'section_names': {
+            'global': collections.Counter(),
+            'last_revision': collections.Counter(),
+        },
+    }
+
+
 def configure_subparsers(subparsers):
     """Configure a new subparser."""
     parser = subparsers.add_parser(
@@ -119,27 +146,21 @@ def configure_subparsers(subparsers):
         action='store_true',
         help='Consider only the last revision for each page.',
     )
-    parser.set_defaults(func=main)
+    parser.set_defaults(func=main, new_stats=new_stats)
 
 
 def main(
         dump: Iterable[mwxml.Page],
         features_output_h,
         stats_output_h,
-        args) -> None:
-    """Main function that parses the arguments and writes the output."""
-    stats = {
-        'performance': {
-            'start_time': None,
-            'end_time': None,
-            'revisions_analyzed': 0,
-            'pages_analyzed': 0,
-        },
-        'section_names': {
-            'global': collections.Counter(),
-            'last_revision': collections.Counter(),
-        },
-    }
+        args,
+        stats: Optional[Mapping]=None) -> Mapping:
+    """Main function that parses the arguments and writes the output.
+
+    The stats collected so far can be given, they are updated in place.
+    """
+    if stats is None:
+        stats = new_stats()
 
     writer = csv.writer(features_output_h)
 
@@ -215,3 +236,5 @@ def main(
                     wikilink.section_level,
                     wikilink.section_number
                 ))
+
+    return stats
@@ -0,0 +1,282 @@
+"""Readers of the XML dumps.
+
+The processors iterate over a dump, its pages and their revisions. The
+default reader is mwxml; the lxml one exposes the same attributes of the
+pages and revisions used by the processors, but it is built on the C parser
+of lxml and its objects are far cheaper to create.
+"""
+import calendar
+import collections
+import time
+
+import lxml.etree
+import mwxml
+from typing import IO, Iterator, Optional
+
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+User = collections.namedtuple('User', [
+    'id',
+    'text',
+])
+
+Namespace = collections.namedtuple('Namespace', [
+    'id',
+    'name',
+    'case',
+])
+
+SiteInfo = collections.namedtuple('SiteInfo', [
+    'name',
+    'dbname',
+    'base',
+    'generator',
+    'case',
+    'namespaces',
+])
+
+
+class Timestamp(str):
+    """Timestamp of a revision, as found in the dump."""
+
+    __slots__ = ()
+
+    def to_json(self) -> str:
+        return str(self)
+
+    def unix(self) -> int:
+        return calendar.timegm(time.strptime(self, TIMESTAMP_FORMAT))
+
+
+class Revision:
+    """A revision of a page."""
+
+    __slots__ = (
+        'id',
+        'parent_id',
+        'timestamp',
+        'user',
+        'minor',
+        'comment',
+        'model',
+        'format',
+        'text',
+        'sha1',
+    )
+
+    def __init__(self):
+        self.id = None
+        self.parent_id = None
+        self.timestamp = None
+        self.user = None
+        self.minor = False
+        self.comment = None
+        self.model = None
+        self.format = None
+        self.text = None
+        self.sha1 = None
+
+
+class Page:
+    """A page of the dump, an iterator over its revisions."""
+
+    __slots__ = (
+        'id',
+        'title',
+        'namespace',
+        'redirect',
+        'restrictions',
+        'revisions',
+    )
+
+    def __init__(self):
+        self.id = None
+        self.title = None
+        self.namespace = None
+        self.redirect = None
+        self.restrictions = []
+        self.revisions = iter(())
+
+    def __iter__(self) -> Iterator[Revision]:
+        return self.revisions
+
+
+# Marks the end of the revisions of a page in the stream of parsed items.
+_PAGE_END = object()
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition('}')[2]
+
+
+def _parse_site_info(element) -> SiteInfo:
+    values = {}
+    namespaces = []
+    for child in element:
+        tag = _local_name(child.tag)
+        if tag == 'namespaces':
+            for namespace in child:
+                namespaces.append(Namespace(
+                    id=int(namespace.get('key')),
+                    name=namespace.text or '',
+                    case=namespace.get('case'),
+                ))
+        else:
+            values[tag] = child.text
+    return SiteInfo(
+        name=values.get('sitename'),
+        dbname=values.get('dbname'),
+        base=values.get('base'),
+        generator=values.get('generator'),
+        case=values.get('case'),
+        namespaces=namespaces,
+    )
+
+
+def _parse_page(element, namespace_length: int) -> Page:
+    """Parse the head of a page, the elements before its revisions."""
+    page = Page()
+    for child in element:
+        tag = child.tag[namespace_length:]
+        if tag == 'title':
+            page.title = child.text
+        elif tag == 'ns':
+            page.namespace = int(child.text)
+        elif tag == 'id':
+            page.id = int(child.text)
+        elif tag == 'redirect':
+            page.redirect = child.get('title')
+        elif tag == 'restrictions':
+            page.restrictions.append(child.text)
+        elif tag == 'revision':
+            break
+    return page
+
+
+def _parse_user(element, namespace_length: int) -> Optional[User]:
+    if element.get('deleted') is not None:
+        return None
+    id_ = None
+    text = None
+    for child in element:
+        tag = child.tag[namespace_length:]
+        if tag == 'id':
+            id_ = int(child.text)
+        else:
+            text = child.text
+    return User(id_, text)
+
+
+def _parse_revision(element, namespace_length: int) -> Revision:
+    revision = Revision()
+    for child in element:
+        tag = child.tag[namespace_length:]
+        if tag == 'text':
+            if child.get('deleted') is None:
+                revision.text = child.text or None
+        elif tag == 'id':
+            revision.id = int(child.text)
+        elif tag == 'parentid':
+            revision.parent_id = int(child.text)
+        elif tag == 'timestamp':
+            revision.timestamp = Timestamp(child.text)
+        elif tag == 'contributor':
+            revision.user = _parse_user(child, namespace_length)
+        elif tag == 'minor':
+            revision.minor = True
+        elif tag == 'comment':
+            if child.get('deleted') is None:
+                revision.comment = child.text
+        elif tag == 'model':
+            revision.model = child.text
+        elif tag == 'format':
+            revision.format = child.text
+        elif tag == 'sha1':
+            revision.sha1 = child.text
+    return revision
+
+
+def _release(element) -> None:
+    """Free the memory used by an element and by its preceding siblings."""
+    element.clear()
+    parent = element.getparent()
+    while element.getprevious() is not None:
+        del parent[0]
+
+
+class LxmlDump:
+    """A dump read with lxml.etree.iterparse.
+
+    The elements are freed as soon as they have been parsed, so the memory
+    used does not grow with the size of the dump.
+    """
+
+    def __init__(self, xml_stream: IO[bytes]):
+        """Read the site info of the dump in xml_stream."""
+        self._events = lxml.etree.iterparse(
+            xml_stream,
+            events=('start', 'end'),
+            tag=('{*}siteinfo', '{*}page', '{*}revision'),
+            huge_tree=True,
+        )
+        self.site_info = None
+        self._namespace_length = 0
+        for event, element in self._events:
+            if event == 'end':
+                self.site_info = _parse_site_info(element)
+                self._namespace_length = element.tag.index('}') + 1 \
+                    if element.tag.startswith('{') else 0
+                _release(element)
+                break
+        self._items = self._parse_items()
+
+    @classmethod
+    def from_file(cls, xml_stream: IO[bytes]) -> 'LxmlDump':
+        return cls(xml_stream)
+
+    def _parse_items(self):
+        """Yield the pages, their revisions and _PAGE_END after them."""
+        namespace_length = self._namespace_length
+        page_pending = False
+        for event, element in self._events:
+            is_page = element.tag[namespace_length:] == 'page'
+            if event == 'start':
+                page_pending = page_pending or is_page
+                # The head of the page is complete at its first revision
+                if page_pending and not is_page:
+                    page_pending = False
+                    yield _parse_page(element.getparent(), namespace_length)
+            elif is_page:
+                if page_pending:
+                    page_pending = False
+                    yield _parse_page(element, namespace_length)
+                yield _PAGE_END
+                _release(element)
+            else:
+                yield _parse_revision(element, namespace_length)
+                _release(element)
+
+    def _revisions(self) -> Iterator[Revision]:
+        for item in self._items:
+            if item is _PAGE_END:
+                return
+            yield item
+
+    def __iter__(self) -> Iterator[Page]:
+        for page in self._items:
+            page.revisions = self._revisions()
+            yield page
+            # Skip the revisions not consumed
+            for _ in page.revisions:
+                pass
+
+
+READERS = {
+    'mwxml': mwxml.Dump.from_file,
+    'lxml': LxmlDump.from_file,
+}
+
+
+def open_dump(xml_stream: IO[bytes], reader: str='mwxml'):
+    """Return the dump in xml_stream, read with the given reader."""
+    return READERS[reader](xml_stream)
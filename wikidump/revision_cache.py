@@ -0,0 +1,70 @@
+"""Cache of the features extracted from the revisions of a page.
+
+The same text shows up many times in the history of a page, e.g. a
+vandalism and its revert: the features extracted from a revision are kept
+by the sha1 of its text, found in the dump, and reused for the next
+revisions of the page with the same sha1. When the dump has no valid sha1,
+the text is hashed.
+"""
+import collections
+import hashlib
+
+import regex
+from typing import Callable, MutableMapping, Optional, TypeVar
+
+# The number of texts of a page whose features are kept.
+CACHE_SIZE = 16
+
+# The sha1 of the dumps is in base 36 (other processors write e.g. "dummy").
+SHA1_RE = regex.compile(r'[0-9a-z]{31}')
+
+T = TypeVar('T')
+
+
+def content_key(revision) -> str:
+    """Return the key of the text of a revision."""
+    sha1 = getattr(revision, 'sha1', None)
+    if sha1 and SHA1_RE.fullmatch(sha1):
+        return sha1
+    text = revision.text or ''
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class RevisionCache:
+    """LRU cache of the features of the revisions, by their text."""
+
+    def __init__(self,
+                 size: int=CACHE_SIZE,
+                 stats: Optional[MutableMapping[str, int]]=None):
+        """Instantiate an empty cache.
+
+        The hits are counted in stats['cache_hits'], if given.
+        """
+        self.size = size
+        self.stats = stats
+        self.hits = 0
+        self.misses = 0
+        self._features = collections.OrderedDict()
+
+    def get(self, revision, extract: Callable[[], T]) -> T:
+        """Return the features of revision, extracted by extract if they
+        are not in the cache.
+        """
+        key = content_key(revision)
+        features = self._features.get(key)
+        if features is not None:
+            self._features.move_to_end(key)
+            self.hits += 1
+            if self.stats is not None:
+                self.stats['cache_hits'] += 1
+            return features
+
+        self.misses += 1
+        features = extract()
+        self._features[key] = features
+        if len(self._features) > self.size:
+            self._features.popitem(last=False)
+        return features
+
+    def __len__(self) -> int:
+        return len(self._features)
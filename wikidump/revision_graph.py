@@ -0,0 +1,174 @@
+"""The revisions of a page, linked to their parents.
+
+The graph is kept in parallel arrays, indexed in the order the revisions
+were added: the id of each revision, the id of its parent, its unix
+timestamp and the id of its content (e.g. the sha1 of its text, see
+revision_cache.content_key). The indexes of the parents are resolved when
+first needed.
+"""
+import array
+import collections
+import heapq
+
+from typing import Hashable, Iterator, List, Optional, Sequence
+
+# The parent of the revisions without one, or whose parent is missing.
+NO_PARENT = -1
+
+# The content of the revisions without one, different from any other.
+NO_CONTENT = -1
+
+Revert = collections.namedtuple('Revert', [
+    'reverting',
+    'reverted_to',
+    'reverteds',
+])
+
+
+class RevisionGraph:
+    """The revisions of a page, as parallel arrays."""
+
+    __slots__ = (
+        'ids',
+        'parent_ids',
+        'timestamps',
+        'contents',
+        '_content_ids',
+        '_parents',
+    )
+
+    def __init__(self):
+        """Instantiate an empty graph."""
+        self.ids = array.array('q')
+        self.parent_ids = array.array('q')
+        self.timestamps = array.array('q')
+        self.contents = array.array('l')
+        self._content_ids = {}
+        self._parents = None
+
+    def add(self,
+            revision_id: int,
+            parent_id: Optional[int],
+            timestamp: int,
+            content: Optional[Hashable]=None) -> int:
+        """Add a revision, return its index.
+
+        The revisions with the same content are the same text, a revision
+        without content is different from any other.
+        """
+        index = len(self.ids)
+        self.ids.append(revision_id)
+        self.parent_ids.append(NO_PARENT if parent_id is None else parent_id)
+        self.timestamps.append(timestamp)
+        if content is None:
+            content_id = NO_CONTENT
+        else:
+            content_id = self._content_ids.setdefault(
+                content, len(self._content_ids))
+        self.contents.append(content_id)
+        self._parents = None
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def parents(self) -> Sequence[int]:
+        """The index of the parent of each revision, NO_PARENT if the
+        revision has none or if it is missing from the graph.
+        """
+        if self._parents is None:
+            indexes = {revision_id: index
+                       for index, revision_id in enumerate(self.ids)}
+            self._parents = array.array('l', (
+                indexes.get(parent_id, NO_PARENT)
+                for parent_id in self.parent_ids))
+        return self._parents
+
+    def missing_parents(self) -> List[int]:
+        """Return the indexes of the revisions whose parent is not in the
+        graph.
+        """
+        return [
+            index
+            for index, (parent_id, parent) in enumerate(
+                zip(self.parent_ids, self.parents))
+            if parent_id != NO_PARENT and parent == NO_PARENT
+        ]
+
+    def timestamp_order(self) -> List[int]:
+        """Return the indexes of the revisions sorted by timestamp and id."""
+        return sorted(range(len(self)),
+                      key=lambda index: (self.timestamps[index],
+                                         self.ids[index]))
+
+    def topological_order(self) -> List[int]:
+        """Return the indexes of the revisions, each one after its parent.
+
+        Among the revisions whose parent has already been returned, the
+        earliest (by timestamp and id) comes first. The revisions in a
+        cycle of parents, if any, are returned last, by timestamp and id.
+        """
+        ids = self.ids
+        timestamps = self.timestamps
+        children = collections.defaultdict(list)
+        ready = []
+        for index, parent in enumerate(self.parents):
+            if parent == NO_PARENT:
+                ready.append((timestamps[index], ids[index], index))
+            else:
+                children[parent].append(index)
+        heapq.heapify(ready)
+
+        order = []
+        while ready:
+            _, _, index = heapq.heappop(ready)
+            order.append(index)
+            for child in children.pop(index, ()):
+                heapq.heappush(ready, (timestamps[child], ids[child], child))
+
+        if len(order) < len(self):
+            in_order = set(order)
+            order.extend(index for index in self.timestamp_order()
+                         if index not in in_order)
+        return order
+
+    def reverts(self, order: Optional[Sequence[int]]=None) \
+            -> Iterator[Revert]:
+        """Return the identity reverts, walking the revisions in order
+        (topological_order by default).
+
+        A revision reverts to the last previous one with the same content,
+        the revisions in between are reverted. The reverted revisions are
+        not considered anymore, so each revision is reverted at most once
+        and the reverts are found in linear time.
+        """
+        if order is None:
+            order = self.topological_order()
+        contents = self.contents
+        # The revisions not reverted, and where each content is in it
+        history = []
+        positions = {}
+        for index in order:
+            content = contents[index]
+            position = positions.get(content)
+            if position is not None and position < len(history) - 1:
+                reverteds = history[position + 1:]
+                del history[position + 1:]
+                for reverted in reverteds:
+                    positions.pop(contents[reverted], None)
+                yield Revert(index, history[position], reverteds)
+            elif position is not None:
+                # The same content as the previous revision
+                history.pop()
+            if content != NO_CONTENT:
+                positions[content] = len(history)
+            history.append(index)
+
+    def reverted(self, order: Optional[Sequence[int]]=None) -> bytearray:
+        """Return, for each revision, whether it has been reverted."""
+        reverted = bytearray(len(self))
+        for revert in self.reverts(order):
+            for index in revert.reverteds:
+                reverted[index] = True
+        return reverted
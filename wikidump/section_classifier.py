@@ -0,0 +1,179 @@
+"""Classify the section names against a list of synonyms (e.g. bibliography).
+
+A name matches if fuzzywuzzy.process.extractOne finds a synonym scoring at
+least score_cutoff with the default scorer (fuzz.WRatio). The classifier
+gives the same answers as fuzzywuzzy 0.18, which processes the name as well
+as the synonyms and lets the scorer skip processing them again, but:
+
+* the synonyms are normalized once, when the classifier is built;
+* a name equal to a synonym, as is or once normalized, scores 100 and is
+  matched without scoring it;
+* WRatio scales by 0.9 the scores of strings whose lengths differ by 1.5
+  times or more, the synonyms that cannot reach the cutoff because of their
+  length are not scored at all;
+* the answers are kept in a bounded cache, which can be saved and loaded
+  back in the next run.
+
+The counters record how each name has been classified.
+"""
+import collections
+import fcntl
+import os
+import pathlib
+import pickle
+import tempfile
+
+import fuzzywuzzy.fuzz
+import fuzzywuzzy.utils
+from typing import Iterable, Mapping
+
+# The number of section names in the cache, enwiki has a long tail of them.
+CACHE_SIZE = 100000
+
+# WRatio scores the strings of different length with partial ratios, scaled
+# by PARTIAL_SCALE: they score at most PARTIAL_SCALE * 100.
+PARTIAL_LENGTH_RATIO = 1.5
+PARTIAL_SCALE = .90
+
+
+def hit_rate(counters: Mapping[str, int]) -> float:
+    """Return the fraction of the names classified without scoring, given
+    the counters of a classifier.
+    """
+    total = sum(counters.values())
+    if not total:
+        return 0.
+    return 1 - counters['scored'] / total
+
+
+def normalize(name: str) -> str:
+    """Return a name as processed by fuzzywuzzy.process.extractOne."""
+    name = fuzzywuzzy.utils.full_process(name)
+    return fuzzywuzzy.utils.full_process(name, force_ascii=True)
+
+
+class SectionClassifier:
+    """Tell whether a section name matches one of the synonyms."""
+
+    def __init__(self,
+                 synonyms: Iterable[str],
+                 score_cutoff: int,
+                 cache_size: int=CACHE_SIZE):
+        """Instantiate a classifier for the given synonyms."""
+        self.synonyms = frozenset(synonyms)
+        self.normalized_synonyms = frozenset(
+            normalize(synonym) for synonym in self.synonyms)
+        self.score_cutoff = score_cutoff
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.counters = collections.Counter()
+
+        # If the cutoff is above the score of the partial ratios, only the
+        # synonyms of a similar length can match.
+        self._similar_length_only = score_cutoff > PARTIAL_SCALE * 100
+        self._scored_synonyms = sorted(
+            (len(synonym), synonym)
+            for synonym in self.normalized_synonyms if synonym)
+
+    def __call__(self, section_name: str) -> bool:
+        """Return True if section_name matches one of the synonyms."""
+        if section_name in self.synonyms:
+            self.counters['exact'] += 1
+            return True
+
+        cache = self.cache
+        match = cache.get(section_name)
+        if match is not None:
+            cache.move_to_end(section_name)
+            self.counters['cached'] += 1
+            return match
+
+        normalized_name = normalize(section_name)
+        if normalized_name in self.normalized_synonyms:
+            self.counters['normalized'] += 1
+            match = True
+        else:
+            self.counters['scored'] += 1
+            match = self._score(normalized_name)
+
+        cache[section_name] = match
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return match
+
+    def _score(self, normalized_name: str) -> bool:
+        if not normalized_name:
+            # WRatio scores an empty string 0
+            return bool(self._scored_synonyms) and self.score_cutoff <= 0
+
+        length = len(normalized_name)
+        for synonym_length, synonym in self._scored_synonyms:
+            if self._similar_length_only and \
+                    max(length, synonym_length) / min(length, synonym_length) \
+                    >= PARTIAL_LENGTH_RATIO:
+                continue
+            score = fuzzywuzzy.fuzz.WRatio(
+                normalized_name, synonym, full_process=False)
+            if score >= self.score_cutoff:
+                return True
+        return False
+
+    def hit_rate(self) -> float:
+        """Return the fraction of the names classified without scoring."""
+        return hit_rate(self.counters)
+
+    def _saved_cache(self, path: pathlib.Path) -> Mapping[str, bool]:
+        """Return the answers saved at path for the same synonyms and
+        cutoff, if any.
+        """
+        if not os.path.exists(str(path)):
+            return {}
+        with open(str(path), 'rb') as f:
+            saved = pickle.load(f)
+        if saved['synonyms'] != self.synonyms \
+                or saved['score_cutoff'] != self.score_cutoff:
+            return {}
+        return saved['cache']
+
+    def load_cache(self, path: pathlib.Path) -> None:
+        """Add to the cache the answers saved at path, if any.
+
+        The answers saved for other synonyms or another cutoff are ignored.
+        """
+        for section_name, match in self._saved_cache(path).items():
+            self.cache[section_name] = match
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def save_cache(self, path: pathlib.Path) -> None:
+        """Save the cache at path, atomically replacing the previous one.
+
+        The processes of a run (e.g. the jobs of the chunks) save to the
+        same path: the saved file is locked, read back and merged with the
+        cache, the answers of this classifier being the most recent ones.
+        """
+        path = str(path)
+        with open(path + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            cache = collections.OrderedDict(
+                (section_name, match)
+                for section_name, match in self._saved_cache(path).items()
+                if section_name not in self.cache
+            )
+            cache.update(self.cache)
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+
+            with tempfile.NamedTemporaryFile(
+                    dir=os.path.dirname(os.path.abspath(path)),
+                    delete=False) as f:
+                try:
+                    pickle.dump({
+                        'synonyms': self.synonyms,
+                        'score_cutoff': self.score_cutoff,
+                        'cache': cache,
+                    }, f, pickle.HIGHEST_PROTOCOL)
+                except BaseException:
+                    os.unlink(f.name)
+                    raise
+            os.replace(f.name, path)
@@ -1,13 +1,15 @@
 """Various utilities."""
 
+import array
+import bisect
 import functools
 import itertools
 import sys
 
 import more_itertools
 import regex as re
-from typing import (Generic, Iterable, List, NamedTuple, Optional, T, Tuple,
-                    TypeVar)
+from typing import (Generic, Iterable, List, Mapping, NamedTuple, Optional, T,
+                    Tuple, TypeVar)
 
 
 class Diff(NamedTuple("Diff", [("action", str), ("data", T)]), Generic[T]):
@@ -93,10 +95,76 @@ def log(*args):
     print('\n' + str(first), *rest, end='', file=sys.stderr, flush=True)
 
 
+comments_re = re.compile(r'<!--(.*?)-->', re.MULTILINE | re.DOTALL)
+
+
 def remove_comments(source: str) -> str:
     """Remove all the html comments from a string."""
-    pattern = re.compile(r'<!--(.*?)-->', re.MULTILINE | re.DOTALL)
-    return pattern.sub('', source)
+    if '<!--' not in source:
+        return source
+    return comments_re.sub('', source)
+
+
+class CommentMask:
+    """The html comments of a string, found once.
+
+    The extractors read the text without the comments, so that e.g. an
+    identifier split by a comment is read whole and a section name keeps
+    nothing of it: the results are the same as on remove_comments. The
+    comments are recorded as they are removed, and the offsets in the text
+    are mapped back to the original string.
+    """
+
+    __slots__ = ('source', 'text', '_positions', '_shifts')
+
+    def __init__(self, source: str, comments: Optional[Iterable]=None):
+        """Find the comments of source and build the text without them.
+
+        The matches of the comments can be given, e.g. the table of the
+        comments of extractors.lexer.Tokens, so that they are not scanned
+        again.
+        """
+        self.source = source
+        # Where each comment was in the text, and the length of the
+        # comments removed up to it
+        self._positions = array.array('l')
+        self._shifts = array.array('l')
+        if comments is None:
+            if '<!--' not in source:
+                self.text = source
+                return
+            comments = comments_re.finditer(source)
+
+        parts = []
+        last_end = 0
+        for match in comments:
+            parts.append(source[last_end:match.start()])
+            last_end = match.end()
+            self._shifts.append(
+                (self._shifts[-1] if self._shifts else 0)
+                + match.end() - match.start())
+            self._positions.append(match.end() - self._shifts[-1])
+        if not parts:
+            self.text = source
+            return
+        parts.append(source[last_end:])
+        self.text = ''.join(parts)
+
+    def original_offset(self, offset: int) -> int:
+        """Return the offset in the original string of the character at
+        offset in the text.
+        """
+        i = bisect.bisect_right(self._positions, offset)
+        return offset + (self._shifts[i - 1] if i else 0)
+
+    def original_span(self, begin: int, end: int) -> Tuple[int, int]:
+        """Return the span in the original string of the text from begin
+        to end, with the comments inside it.
+        """
+        if begin >= end:
+            original_begin = self.original_offset(begin)
+            return original_begin, original_begin
+        return self.original_offset(begin), self.original_offset(end - 1) + 1
 
 
 def has_next(peekable: more_itertools.peekable) -> bool:
@@ -120,3 +188,26 @@ def pairwise(iterable):
     a, b = itertools.tee(iterable)
     next(b, None)
     return zip(a, b)
+
+
+def merge_stats(stats: Mapping, other: Mapping) -> Mapping:
+    """Merge the stats of two runs of the same processor, in place.
+
+    Counters are summed, while "start_time" and "end_time" keep the
+    earliest and the latest time respectively.
+    """
+    for key, value in other.items():
+        current = stats.get(key)
+        if current is None:
+            stats[key] = value
+        elif value is None:
+            continue
+        elif isinstance(value, Mapping):
+            merge_stats(current, value)
+        elif key == 'start_time':
+            stats[key] = min(current, value)
+        elif key == 'end_time':
+            stats[key] = max(current, value)
+        else:
+            stats[key] = current + value
+    return stats